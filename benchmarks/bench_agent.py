@@ -0,0 +1,106 @@
+# Benchmark: agent round trips and request size over a long session, and
+# time to first output for answers, against a local stub endpoint
+#
+#   python benchmarks/bench_agent.py [--turns N] [--latency S] [--token-latency S]
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from stub_server import StubServer
+
+from openai import OpenAI
+from secapi import agent
+from secapi.chunker import estimate_tokens
+
+# A session mixing exact commands, typos, aliases and questions for the model.
+SCRIPT = [
+    "list",
+    "rotate stripe_key",
+    "lsit",
+    "how do I load a key from my code?",
+    "chekc ./tests",
+    "check ./src",
+    "what does the pre-commit hook scan, only staged lines or the whole file?",
+    "ls",
+    "please rotate the key I added yesterday for the payments service",
+    "ai app.py",
+]
+REPLY = "Call load_key(\"name\") from secapi.secure; it prompts for the vault password once per process."
+
+
+def session(stub, turns, history_tokens, local):
+    client = OpenAI(base_url=stub.url, api_key="stub", max_retries=0)
+    bot = agent.SecAPIAgent(client=client, deployment="stub", history_tokens=history_tokens)
+    if not local:
+        bot.match_local = lambda user_input: None
+    start = time.perf_counter()
+    for i in range(turns):
+        bot.interpret_command(SCRIPT[i % len(SCRIPT)])
+    return time.perf_counter() - start
+
+
+class FirstWrite(io.StringIO):
+    """Swallows output and notes when the first visible text was written."""
+
+    def __init__(self):
+        super().__init__()
+        self.at = None
+
+    def write(self, text):
+        if self.at is None and text.strip():
+            self.at = time.perf_counter()
+        return super().write(text)
+
+
+def first_output(stub, turns, stream):
+    """Median seconds from sending a question to printing the answer's first word, and to finishing it."""
+    client = OpenAI(base_url=stub.url, api_key="stub", max_retries=0)
+    bot = agent.SecAPIAgent(client=client, deployment="stub")
+    first, done = [], []
+    for _ in range(turns):
+        out = FirstWrite()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(out):
+            if stream:
+                bot.respond("how do I load a key from my code?")
+            else:
+                bot.execute_command(*bot.parse_command(bot.interpret_command("how do I load a key from my code?")))
+        first.append(out.at - start)
+        done.append(time.perf_counter() - start)
+    return statistics.median(first), statistics.median(done)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agent session benchmark")
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--token-latency", type=float, default=0.01, help="Seconds per streamed piece of a reply.")
+    parser.add_argument("--answers", type=int, default=10, help="Questions asked for the time-to-first-output runs.")
+    args = parser.parse_args()
+
+    modes = {
+        "model only, full history": (None, False),
+        "local parser, full history": (None, True),
+        "local parser, window": (agent.HISTORY_TOKENS, True),
+    }
+    for label, (history_tokens, local) in modes.items():
+        with StubServer(REPLY, args.latency) as stub:
+            elapsed = session(stub, args.turns, history_tokens, local)
+            last = sum(estimate_tokens(message["content"]) for message in stub.bodies[-1]["messages"])
+        print(f"{label:28} {elapsed:6.2f}s for {args.turns} turns, {stub.requests:4} requests, "
+              f"{stub.request_bytes / 1e6:6.2f} MB sent, last request ~{last} tokens")
+
+    for label, stream in (("blocking answer", False), ("streamed answer", True)):
+        with StubServer(REPLY, args.latency, token_latency=args.token_latency) as stub:
+            first, done = first_output(stub, args.answers, stream)
+        print(f"{label:28} first output {first * 1000:6.1f} ms, complete {done * 1000:6.1f} ms (median)")
+
+
+if __name__ == "__main__":
+    main()
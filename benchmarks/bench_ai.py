@@ -0,0 +1,44 @@
+# Benchmark: AI scan request fan-out against a local stub endpoint
+#
+#   python benchmarks/bench_ai.py [--requests N] [--latency S] [--concurrency N]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from stub_server import StubServer
+
+from openai import AsyncOpenAI
+from secapi import ai_engine
+
+
+def run(stub, requests, concurrency):
+    client = AsyncOpenAI(base_url=stub.url, api_key="stub", max_retries=0)
+    messages = [[{"role": "user", "content": f"file {i}"}] for i in range(requests)]
+    start = time.perf_counter()
+    replies = ai_engine.complete_all(messages, concurrency=concurrency, client=client)
+    elapsed = time.perf_counter() - start
+    failures = sum(1 for reply in replies if isinstance(reply, Exception))
+    return elapsed, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI engine fan-out benchmark")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--concurrency", type=int, default=ai_engine.MAX_CONCURRENCY)
+    parser.add_argument("--rate-limit-every", type=int, default=7, help="Answer every Nth request with 429.")
+    args = parser.parse_args()
+
+    reply = '🧪 1: api_key = "abc"'
+    for concurrency in (1, args.concurrency):
+        with StubServer(reply, args.latency, args.rate_limit_every) as stub:
+            elapsed, failures = run(stub, args.requests, concurrency)
+        print(f"concurrency {concurrency:>3}: {elapsed:.2f}s for {args.requests} scans "
+              f"({stub.requests} requests, {stub.rate_limited} rate-limited, {failures} failed)")
+
+
+if __name__ == "__main__":
+    main()
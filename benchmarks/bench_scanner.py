@@ -0,0 +1,67 @@
+# Benchmark: combined pattern engine vs. the original per-pattern loop
+#
+#   python benchmarks/bench_scanner.py [--files N] [--lines N]
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from corpus import generate_corpus
+from secapi.scanner import PATTERNS, scan_directory
+
+
+def legacy_scan_directory(directory):
+    """The original implementation: one uncompiled `re.search` per pattern per line."""
+    findings = []
+    for root, _, files in os.walk(directory):
+        for file in files:
+            if file.endswith(('.py', '.js', '.ts', '.env', '.json', '.yml', '.yaml', '.txt')):
+                path = os.path.join(root, file)
+                try:
+                    with open(path, 'r', errors='ignore') as f:
+                        for i, line in enumerate(f, 1):
+                            for label, pattern in PATTERNS.items():
+                                match = re.search(pattern, line)
+                                if match:
+                                    findings.append((path, i, line.strip(), label))
+                except (PermissionError, IsADirectoryError, UnicodeDecodeError):
+                    pass
+    return findings
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scanner engine benchmark")
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--lines", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        generate_corpus(root, files=args.files, lines=args.lines)
+        legacy, legacy_time = timed(legacy_scan_directory, root)
+        current, current_time = timed(scan_directory, root, 1, False, None)
+        _, entropy_time = timed(scan_directory, root)
+
+    if sorted(legacy) != sorted(tuple(finding) for finding in current):
+        print("❌ Findings differ between the legacy and combined engines.")
+        sys.exit(1)
+
+    total = args.files * args.lines
+    print(f"📄 {args.files} files, {total} lines, {len(current)} findings")
+    print(f"  legacy per-pattern : {legacy_time:.3f}s ({total / legacy_time:,.0f} lines/s)")
+    print(f"  combined engine    : {current_time:.3f}s ({total / current_time:,.0f} lines/s)")
+    print(f"  speedup            : {legacy_time / current_time:.1f}x")
+    print(f"  with entropy       : {entropy_time:.3f}s ({total / entropy_time:,.0f} lines/s)")
+
+
+if __name__ == "__main__":
+    main()
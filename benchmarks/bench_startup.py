@@ -0,0 +1,74 @@
+# Benchmark: CLI cold-start cost per command, from `python -X importtime`
+#
+#   python benchmarks/bench_startup.py [--repeat N] [--top N]
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Each command runs against an empty HOME, so none of them prompt.
+COMMANDS = {
+    "list": ["-m", "secapi.cli", "list"],
+    "load": ["-m", "secapi.cli", "load", "missing_key"],
+    "lock": ["-m", "secapi.cli", "lock"],
+    "check": ["-m", "secapi.cli", "check", "{empty}"],
+    "ai (imports only)": ["-c", "import secapi.scanner_ai, secapi.ai_engine, openai"],
+}
+# What the vault commands should cost: the interpreter plus `cryptography`.
+REFERENCES = {
+    "python": ["-c", "pass"],
+    "cryptography": ["-c", "import cryptography.fernet"],
+}
+
+
+def import_profile(argv, env):
+    """Runs one command and returns `{module: (self_us, cumulative_us)}` for top-level imports."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *argv], env=env, cwd=ROOT,
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Only top-level entries (one space of indentation) add up to the total.
+        if not name.startswith("  "):
+            modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def measure(argv, env, repeat):
+    """Best-of-`repeat` total import time in ms and the slowest top-level imports."""
+    best = None
+    for _ in range(repeat):
+        modules = import_profile(argv, env)
+        total = sum(cumulative for _, cumulative in modules.values()) / 1000
+        if best is None or total < best[0]:
+            best = (total, modules)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI startup benchmark")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=3, help="Slowest top-level imports to list per command.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as home, tempfile.TemporaryDirectory() as empty:
+        env = dict(os.environ, HOME=home, PYTHONPATH=ROOT, SECAPI_AGENT_SOCK=os.path.join(home, "agent.sock"))
+        env.pop("XDG_CACHE_HOME", None)
+        for label, argv in {**REFERENCES, **COMMANDS}.items():
+            argv = [arg.replace("{empty}", empty) for arg in argv]
+            total, modules = measure(argv, env, args.repeat)
+            slowest = sorted(modules.items(), key=lambda item: -item[1][1])[:args.top]
+            detail = ", ".join(f"{name} {cumulative / 1000:.1f}" for name, (_, cumulative) in slowest)
+            print(f"{label:20} {total:8.1f} ms imports   ({detail})")
+
+
+if __name__ == "__main__":
+    main()
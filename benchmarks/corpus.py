@@ -0,0 +1,113 @@
+# Deterministic synthetic corpus with planted secrets, for benchmarks
+#
+#   python benchmarks/corpus.py <dir> [--files N] [--lines N] [--seed N]
+
+import argparse
+import json
+import os
+import random
+import string
+
+ALNUM = string.ascii_letters + string.digits
+HEX = "0123456789abcdef"
+WORDS = [
+    "def", "return", "import", "value", "self", "print", "for", "in", "range",
+    "if", "else", "config", "result", "items", "user", "name", "data", "path",
+]
+EXTENSIONS = [".py", ".js", ".ts", ".json", ".yml", ".env", ".txt"]
+
+
+def _rand(rng, alphabet, length):
+    return "".join(rng.choice(alphabet) for _ in range(length))
+
+
+# One generator per scanner.PATTERNS label, producing a matching line.
+SECRET_LINES = {
+    "Stripe": lambda rng: f'value = "sk_live_{_rand(rng, ALNUM, 24)}"',
+    "Google": lambda rng: f'value = "AIza{_rand(rng, ALNUM + "-_", 35)}"',
+    "GitHub": lambda rng: f'value = "ghp_{_rand(rng, ALNUM, 36)}"',
+    "Slack": lambda rng: f'value = "xoxb-{_rand(rng, string.digits, 12)}-{_rand(rng, ALNUM, 24)}"',
+    "OpenAI": lambda rng: f'value = "sk-{_rand(rng, ALNUM, 48)}"',
+    "Microsoft Graph": lambda rng: "value = \"{}-{}-{}-{}-{}\"".format(
+        _rand(rng, HEX, 8), _rand(rng, HEX, 4), _rand(rng, HEX, 4), _rand(rng, HEX, 4), _rand(rng, HEX, 12)),
+    "AWS Access Key": lambda rng: f'value = "AKIA{_rand(rng, string.ascii_uppercase + string.digits, 16)}"',
+    "AWS Secret Key": lambda rng: f'aws_secret_access_key = "{_rand(rng, ALNUM + "/+", 40)}"',
+    "Twilio": lambda rng: f'value = "SK{_rand(rng, HEX, 32)}"',
+    "Heroku": lambda rng: f'value = "heroku_{_rand(rng, HEX, 32)}"',
+    "SendGrid": lambda rng: f'value = "SG.{_rand(rng, ALNUM, 22)}.{_rand(rng, ALNUM, 43)}"',
+    "Dropbox": lambda rng: f'value = "sl.{_rand(rng, ALNUM, 24)}"',
+    "Generic": lambda rng: f'api_key = "{_rand(rng, ALNUM, 24)}"',
+}
+
+# Near misses that no detector should report.
+DECOY_LINES = [
+    'value = "sk_live_short"',
+    'value = "ghp_tooShort"',
+    'value = "AKIAlowercase00000000"',
+    'value = "xoxz-not-a-token"',
+    'api_key = load_key("api_key")',
+    'token = os.environ["API_TOKEN"]',
+    'value = "SG.short.short"',
+    'value = "ABCDEF12-3456-7890-ABCD-EF1234567890"',
+    'value = "heroku_app"',
+    'password = "changeme"',
+]
+
+
+def _filler(rng):
+    return "    " + " ".join(rng.choice(WORDS) for _ in range(8))
+
+
+def generate_corpus(root, files=1000, lines=200, secret_rate=0.002, decoy_rate=0.01,
+                    files_per_dir=50, seed=1234):
+    """
+    Writes `files` files of `lines` lines under `root` and returns a manifest
+    of every planted secret (`[rel_path, line, label]`) and decoy. Every
+    label is planted at least once. The same arguments always produce the
+    same tree.
+    """
+    rng = random.Random(seed)
+    labels = list(SECRET_LINES)
+    manifest = {"planted": [], "decoys": [], "files": files, "lines": files * lines, "bytes": 0}
+    for n in range(files):
+        rel_path = os.path.join(f"pkg_{n // files_per_dir}", f"module_{n}{EXTENSIONS[n % len(EXTENSIONS)]}")
+        os.makedirs(os.path.join(root, os.path.dirname(rel_path)), exist_ok=True)
+        out = []
+        for i in range(1, lines + 1):
+            roll = rng.random()
+            if n < len(labels) and i == 1:
+                label = labels[n]
+            elif roll < secret_rate:
+                label = rng.choice(labels)
+            else:
+                label = None
+            if label:
+                out.append(SECRET_LINES[label](rng))
+                manifest["planted"].append([rel_path, i, label])
+            elif roll < secret_rate + decoy_rate:
+                out.append(rng.choice(DECOY_LINES))
+                manifest["decoys"].append([rel_path, i])
+            else:
+                out.append(_filler(rng))
+        data = "\n".join(out) + "\n"
+        with open(os.path.join(root, rel_path), "w") as f:
+            f.write(data)
+        manifest["bytes"] += len(data)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic secret-scanning corpus")
+    parser.add_argument("root")
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--lines", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+    manifest = generate_corpus(args.root, args.files, args.lines, seed=args.seed)
+    with open(os.path.join(args.root, "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+    print(f"📄 {manifest['files']} files, {len(manifest['planted'])} planted secrets, {len(manifest['decoys'])} decoys")
+
+
+if __name__ == "__main__":
+    main()
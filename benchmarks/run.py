@@ -0,0 +1,254 @@
+# Benchmark suite: scanner throughput, vault latency and fixer rewrites
+#
+#   python benchmarks/run.py [--output results.json] [--baseline baseline.json]
+#
+# Every result has a "seconds" entry (lower is better); with --baseline the
+# run fails when any of them is more than --tolerance slower than the stored
+# value.
+
+import argparse
+import base64
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from corpus import generate_corpus
+
+from cryptography.fernet import Fernet
+from secapi import secure, unlock_agent
+from secapi.vault_store import open_store
+from secapi.remediate import remediate
+from secapi.scanner import Finding, scan_directory
+
+
+def best_of(repeat, fn):
+    """Returns the fastest of `repeat` runs and that run's result."""
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+DATA_KEY = base64.urlsafe_b64encode(b"benchmark".ljust(32, b"0"))
+
+
+@contextlib.contextmanager
+def isolated_vault(directory, fernet):
+    """Points every module at a throwaway vault unlocked with `fernet`."""
+    path = os.path.join(directory, "vault.json")
+    saved = (secure.VAULT_PATH, secure._fernet_instance, secure._data_key)
+    secure.VAULT_PATH = path
+    secure._fernet_instance = fernet
+    secure._data_key = DATA_KEY
+    secure.invalidate_vault_cache()
+    secure._decrypted.clear()
+    try:
+        yield path
+    finally:
+        secure.VAULT_PATH, secure._fernet_instance, secure._data_key = saved
+        secure.invalidate_vault_cache()
+        secure._decrypted.clear()
+
+
+def bench_scan(args, results):
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as cache_home:
+        manifest = generate_corpus(root, files=args.files, lines=args.lines, seed=args.seed)
+        planted = {tuple(p) for p in manifest["planted"]}
+        decoys = {tuple(p) for p in manifest["decoys"]}
+
+        def summarize(seconds, findings):
+            found = {(os.path.relpath(f.path, root), f.line, f.label) for f in findings}
+            return {
+                "seconds": seconds,
+                "files_per_s": manifest["files"] / seconds,
+                "mb_per_s": manifest["bytes"] / seconds / 1e6,
+                "recall": len(planted & found) / len(planted),
+                "decoy_hits": sum(1 for path, line, _ in found if (path, line) in decoys),
+            }
+
+        results["scan.serial"] = summarize(*best_of(args.repeat, lambda: scan_directory(root)))
+        results["scan.patterns_only"] = summarize(*best_of(args.repeat, lambda: scan_directory(root, entropy=None)))
+        if args.jobs > 1:
+            results[f"scan.jobs{args.jobs}"] = summarize(
+                *best_of(args.repeat, lambda: scan_directory(root, jobs=args.jobs)))
+
+        from secapi import scan_cache
+        saved_cache_dir, scan_cache.CACHE_DIR = scan_cache.CACHE_DIR, cache_home
+        try:
+            cold = summarize(*best_of(1, lambda: scan_directory(root, cache=True)))
+            results["scan.cache_cold"] = cold
+            results["scan.cache_warm"] = summarize(*best_of(args.repeat, lambda: scan_directory(root, cache=True)))
+        finally:
+            scan_cache.CACHE_DIR = saved_cache_dir
+
+
+def bench_vault(args, results):
+    fernet = Fernet(DATA_KEY)
+    for size in args.vault_sizes:
+        with tempfile.TemporaryDirectory() as directory, isolated_vault(directory, fernet) as path:
+            open_store(path).write(
+                [("keys", f"key_{i}", fernet.encrypt(f"sk_test_{i}".encode()).decode()) for i in range(size)])
+            # A vault that was just written is re-validated on every read.
+            stale = time.time() - 60
+            os.utime(path, (stale, stale))
+            names = [f"key_{i * 7919 % size}" for i in range(args.calls)]
+
+            def load_all():
+                for name in names:
+                    secure.load_key(name)
+
+            seconds, _ = best_of(args.repeat, load_all)
+            results[f"vault.load_key.{size}"] = {
+                "seconds": seconds,
+                "seconds_per_call": seconds / len(names),
+                "calls": len(names),
+            }
+
+            def load_cold():
+                secure.invalidate_vault_cache()
+                secure._decrypted.clear()
+                secure.load_keys(names)
+
+            seconds, _ = best_of(args.repeat, load_cold)
+            results[f"vault.load_keys_cold.{size}"] = {"seconds": seconds, "calls": 1}
+
+            # Indexing a vault written without fingerprints decrypts every key once.
+            def index_cold():
+                store = open_store(path)
+                store.replace({"fp": {}})
+                secure._decrypted.clear()
+                return secure.vaulted_lookup()
+
+            seconds, lookup = best_of(1, index_cold)
+            results[f"vault.fingerprint_index_cold.{size}"] = {"seconds": seconds, "calls": 1}
+            secrets = [f"sk_test_{i * 7919 % size}" for i in range(args.calls)]
+            seconds, _ = best_of(args.repeat, lambda: [lookup(secret) for secret in secrets])
+            results[f"vault.fingerprint_lookup.{size}"] = {
+                "seconds": seconds,
+                "seconds_per_call": seconds / len(secrets),
+                "calls": len(secrets),
+            }
+
+            if hasattr(os, "fork"):
+                os.environ["SECAPI_AGENT_SOCK"] = os.path.join(directory, "agent.sock")
+                unlock_agent.start(fernet, path, ttl=60)
+                secure._fernet_instance = None
+                try:
+                    seconds, _ = best_of(args.repeat, load_all)
+                finally:
+                    secure._fernet_instance = fernet
+                    unlock_agent.stop()
+                    del os.environ["SECAPI_AGENT_SOCK"]
+                results[f"vault.agent_load_key.{size}"] = {
+                    "seconds": seconds,
+                    "seconds_per_call": seconds / len(names),
+                    "calls": len(names),
+                }
+
+
+def bench_fixer(args, results):
+    fernet = Fernet(DATA_KEY)
+    count = args.fixes
+    with tempfile.TemporaryDirectory() as directory, isolated_vault(directory, fernet):
+        source = os.path.join(directory, "settings.py")
+
+        def findings():
+            with open(source, "w") as f:
+                f.writelines(f'value_{i} = "sk_live_{i:024d}"\n' for i in range(count))
+            open_store(secure.VAULT_PATH).replace({"keys": {}, "fp": {}})
+            return [Finding(source, i + 1, f'value_{i} = "sk_live_{i:024d}"', "Stripe") for i in range(count)]
+
+        # One fix at a time, as `suggest_and_fix` does for a single finding.
+        def remediate_each():
+            pending = findings()
+            with contextlib.redirect_stdout(io.StringIO()):
+                for finding in pending:
+                    remediate([finding], "auto")
+
+        seconds, _ = best_of(args.repeat, remediate_each)
+        results[f"fixer.remediate_each.{count}"] = {"seconds": seconds, "seconds_per_fix": seconds / count}
+
+        def remediate_all():
+            pending = findings()
+            with contextlib.redirect_stdout(io.StringIO()):
+                remediate(pending, "auto")
+
+        seconds, _ = best_of(args.repeat, remediate_all)
+        results[f"fixer.remediate.{count}"] = {"seconds": seconds, "seconds_per_fix": seconds / count}
+
+
+SUITES = {"scan": bench_scan, "vault": bench_vault, "fixer": bench_fixer}
+
+
+def compare(results, baseline, tolerance):
+    """Prints a comparison table and returns the names of regressed benchmarks."""
+    regressions = []
+    print(f"{'benchmark':32} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, result in sorted(results.items()):
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            print(f"{name:32} {'-':>10} {result['seconds']:>9.4f}s {'new':>8}")
+            continue
+        change = result["seconds"] / base["seconds"] - 1
+        flag = " ❌" if change > tolerance else ""
+        print(f"{name:32} {base['seconds']:>9.4f}s {result['seconds']:>9.4f}s {change:>+7.1%}{flag}")
+        if change > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SecAPI benchmark suite")
+    parser.add_argument("--only", default=",".join(SUITES), help="Comma-separated suites to run.")
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--lines", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--vault-sizes", default="10,100,1000,10000")
+    parser.add_argument("--calls", type=int, default=100, help="load_key calls per vault size.")
+    parser.add_argument("--fixes", type=int, default=100, help="Findings rewritten by the fixer benchmark.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    parser.add_argument("--baseline", help="Compare against a previous --output file.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown, e.g. 0.2 for 20%%.")
+    args = parser.parse_args()
+    args.vault_sizes = [int(size) for size in args.vault_sizes.split(",")]
+
+    results = {}
+    for name in args.only.split(","):
+        SUITES[name](args, results)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
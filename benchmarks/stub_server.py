@@ -0,0 +1,121 @@
+# Local stand-in for an OpenAI-compatible chat completions endpoint
+#
+# Replies after a fixed latency with a canned completion, and can answer a
+# share of requests with 429 + Retry-After to exercise client backoff. With
+# `token_latency`, every 4 characters of the reply take that long to
+# "generate", streamed or not, like a real model.
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _pieces(content):
+    return [content[i:i + 4] for i in range(0, len(content), 4)] or [""]
+
+
+class StubServer:
+    def __init__(self, reply="", latency=0.05, rate_limit_every=0, retry_after="0.1", token_latency=None):
+        self.reply = reply
+        self.latency = latency
+        self.token_latency = token_latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.requests = 0
+        self.rate_limited = 0
+        self.request_bytes = 0
+        self.bodies = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def completion(self, body):
+        """Returns the reply text for a request body; override for custom replies."""
+        return self.reply(body) if callable(self.reply) else self.reply
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def handle(self):
+                try:
+                    super().handle()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # The client closed a stream early or dropped a kept-alive connection
+
+            def do_POST(self):
+                raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                body = json.loads(raw or b"{}")
+                with stub._lock:
+                    stub.requests += 1
+                    stub.request_bytes += len(raw)
+                    stub.bodies.append(body)
+                    limited = stub.rate_limit_every and stub.requests % stub.rate_limit_every == 0
+                    if limited:
+                        stub.rate_limited += 1
+                if limited:
+                    self._send(429, {"error": {"message": "rate limited"}}, {"Retry-After": stub.retry_after})
+                    return
+                time.sleep(stub.latency)
+                content = stub.completion(body)
+                if body.get("stream"):
+                    self._stream(content)
+                    return
+                if stub.token_latency:
+                    time.sleep(stub.token_latency * len(_pieces(content)))
+                self._send(200, {
+                    "id": "stub", "object": "chat.completion", "created": 0, "model": body.get("model", "stub"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                })
+
+            def _send(self, status, payload, headers=None):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, content):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                delay = stub.latency / 10 if stub.token_latency is None else stub.token_latency
+                for piece in _pieces(content):
+                    chunk = {
+                        "id": "stub", "object": "chat.completion.chunk", "created": 0, "model": "stub",
+                        "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                    }
+                    self._chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+                    time.sleep(delay)
+                self._chunk(b"data: [DONE]\n\n")
+                self._chunk(b"")
+
+            def _chunk(self, data):
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
@@ -1 +1,10 @@
-from .secure import load_key
\ No newline at end of file
+# The public API is resolved on first use (PEP 562), so importing any secapi
+# module, e.g. for `secapi check`, does not load the vault's crypto stack.
+__all__ = ["load_key", "load_keys"]
+
+
+def __getattr__(name):
+    if name in __all__:
+        from secapi import secure
+        return getattr(secure, name)
+    raise AttributeError(f"module 'secapi' has no attribute {name!r}")
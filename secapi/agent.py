@@ -1,22 +1,67 @@
 # secapi/agent.py (AI-powered command executor + conversational assistant)
 
-from openai import AzureOpenAI
-from secapi.secure import load_key, add_key_interactively, list_keys, delete_key, rotate_key
-from secapi.scanner import scan_directory
-from secapi.scanner_ai import ai_scan_path
+import difflib
+import re
+import time
+
+from secapi import trace
+from secapi.secure import load_keys, add_key_interactively, list_keys, delete_key, rotate_key
+
+# The grammar `parse_command` accepts: each command and whether it takes an argument.
+COMMANDS = {"add": False, "list": False, "exit": False, "delete": True, "rotate": True, "check": True, "ai": True}
+ALIASES = {"ls": "list", "quit": "exit", "scan": "check"}
+
+# How close (difflib ratio) a mistyped word must be to a command to run it
+# without asking the model: "lsit" and "scna" pass, "hi" is not "ai".
+# Commands that end the session or destroy a key must be typed exactly, or
+# "edit" would exit and "deleted stuff" would delete a key named "stuff".
+EXACT_COMMANDS = {"exit", "delete", "rotate"}
+FUZZY_CUTOFF = 0.75
+FUZZY_COMMANDS = [command for command in COMMANDS if command not in EXACT_COMMANDS]
+
+# Token budget for the messages sent with each request, system prompt
+# included, of which up to SUMMARY_TOKENS go to a digest of evicted turns.
+HISTORY_TOKENS = 2000
+SUMMARY_TOKENS = 200
+
+# A streamed reply that starts with a command word is treated as a command
+# until its first line ends; one that runs longer than this is an answer.
+MAX_COMMAND_CHARS = 120
+
+_ARGUMENT = re.compile(r"^[\w./~][\w./~\-]*$")  # A key name or path, never an option like "-rf"
+
+
+def http_client():
+    """
+    An HTTP/2 connection pool when the `h2` package is installed, else None
+    for the SDK's default keep-alive pool. Either way one client serves
+    every turn of a session, so only the first pays for the handshake.
+    """
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return None
+    from openai import DefaultHttpxClient
+    return DefaultHttpxClient(http2=True)
+
 
 class SecAPIAgent:
-    def __init__(self):
-        api_key = load_key("azure_api_key")
-        endpoint = load_key("azure_endpoint")
-        deployment = load_key("azure_deployment")
+    def __init__(self, client=None, deployment=None, history_tokens=HISTORY_TOKENS, summarize=True):
+        if client is None:
+            from openai import AzureOpenAI
+            api_key, endpoint, deployment = load_keys(["azure_api_key", "azure_endpoint", "azure_deployment"])
+            client = AzureOpenAI(
+                api_key=api_key,
+                api_version="2023-07-01-preview",
+                azure_endpoint=endpoint,
+                http_client=http_client()
+            )
 
         self.deployment = deployment
-        self.client = AzureOpenAI(
-            api_key=api_key,
-            api_version="2023-07-01-preview",
-            azure_endpoint=endpoint
-        )
+        self.client = client
+        self.history_tokens = history_tokens  # None keeps every turn
+        self.summarize = summarize
+        self.evicted = []  # One line per user turn that left the window, newest last
 
         self.chat_history = [
             {
@@ -31,15 +76,85 @@ class SecAPIAgent:
             }
         ]
 
+    def match_local(self, user_input):
+        """
+        Resolves input that already is a command, or an alias or one typo
+        away from one, to `(command, argument)` without a network call.
+        Returns None for anything else, which goes to the model.
+        """
+        words = user_input.split()
+        if not words or len(words) > 2:
+            return None
+        word = ALIASES.get(words[0].lower(), words[0].lower())
+        if word not in COMMANDS:
+            close = difflib.get_close_matches(word, FUZZY_COMMANDS, n=1, cutoff=FUZZY_CUTOFF)
+            if not close:
+                return None
+            word = close[0]
+        takes_argument = COMMANDS[word]
+        if takes_argument != (len(words) == 2) or (takes_argument and not _ARGUMENT.match(words[1])):
+            return None
+        return self.parse_command(" ".join([word] + words[1:]))
+
+    def _trim_history(self):
+        """
+        Drops the oldest turns until the history fits `history_tokens`,
+        keeping the system prompt and the latest message. With `summarize`,
+        each evicted request is kept as one line of a bounded digest.
+        """
+        if self.history_tokens is None:
+            return
+        # Here, not at the top: the chunker pulls in the scanner.
+        from secapi.chunker import estimate_tokens
+
+        budget = self.history_tokens - estimate_tokens(self.chat_history[0]["content"])
+        if self.summarize:
+            budget -= SUMMARY_TOKENS
+        turns = self.chat_history[1:]
+        used = sum(estimate_tokens(message["content"]) for message in turns)
+        while len(turns) > 1 and used > budget:
+            message = turns.pop(0)
+            used -= estimate_tokens(message["content"])
+            if self.summarize and message["role"] == "user":
+                self.evicted.append(f"- {' '.join(message['content'].split())[:100]}")
+        self.chat_history[1:] = turns
+
+        while self.evicted and estimate_tokens("\n".join(self.evicted)) > SUMMARY_TOKENS:
+            self.evicted.pop(0)
+
+    def messages(self):
+        """What is sent for the next request: the bounded history, with the digest after the system prompt."""
+        if not self.evicted:
+            return self.chat_history
+        digest = {"role": "system", "content": "Earlier requests in this session:\n" + "\n".join(self.evicted)}
+        return [self.chat_history[0], digest] + self.chat_history[1:]
+
+    def _local_reply(self, user_input):
+        """Records and returns the reply for input `match_local` resolves, else None."""
+        intent = self.match_local(user_input)
+        if intent is None:
+            return None
+        reply = " ".join(part for part in intent if part)
+        self.chat_history.append({"role": "user", "content": user_input})
+        self.chat_history.append({"role": "assistant", "content": reply})
+        self._trim_history()
+        return reply
+
     def interpret_command(self, user_input):
+        reply = self._local_reply(user_input)
+        if reply is not None:
+            return reply
+
         self.chat_history.append({"role": "user", "content": user_input})
+        self._trim_history()
         try:
-            response = self.client.chat.completions.create(
-                model=self.deployment,
-                messages=self.chat_history,
-                temperature=0.3,
-                max_tokens=300
-            )
+            with trace.span("agent.request"):
+                response = self.client.chat.completions.create(
+                    model=self.deployment,
+                    messages=self.messages(),
+                    temperature=0.3,
+                    max_tokens=300
+                )
             reply = response.choices[0].message.content.strip()
             self.chat_history.append({"role": "assistant", "content": reply})
             return reply
@@ -47,13 +162,89 @@ class SecAPIAgent:
             print(f"❌ AI interpretation failed: {e}")
             return None
 
+    def classify_reply(self, text):
+        """
+        Decides from the start of a streamed reply whether it is a command
+        (`"command"`) or an answer (`"chat"`), or None until more arrives.
+        Agrees with `parse_command`, except that a reply running past
+        MAX_COMMAND_CHARS on its first line is an answer, not an argument.
+        """
+        head = text.lstrip().lower()
+        word = head.split(maxsplit=1)[0] if head.strip() else ""
+        if len(head) == len(word):  # The first word may still be growing
+            return None if any(command.startswith(word) for command in COMMANDS) else "chat"
+        if word not in COMMANDS:
+            return "chat"
+        if not COMMANDS[word] or "\n" in head:
+            return "command"
+        return "chat" if len(head) > MAX_COMMAND_CHARS else None
+
+    def respond(self, user_input):
+        """
+        Runs one turn and returns the `(command, value)` to execute. The
+        reply is streamed: an answer is printed as it arrives and comes back
+        as `("chat", None)`, and a command is returned as soon as its line is
+        complete, closing the stream without waiting for the rest.
+        """
+        reply = self._local_reply(user_input)
+        if reply is not None:
+            return self.parse_command(reply)
+
+        self.chat_history.append({"role": "user", "content": user_input})
+        self._trim_history()
+        text, kind = "", None
+        started = time.perf_counter()
+        try:
+            with trace.span("agent.request"):
+                stream = self.client.chat.completions.create(
+                    model=self.deployment,
+                    messages=self.messages(),
+                    temperature=0.3,
+                    max_tokens=300,
+                    stream=True
+                )
+                try:
+                    for chunk in stream:
+                        delta = chunk.choices[0].delta.content if chunk.choices else None
+                        if not delta:
+                            continue
+                        if not text and trace.enabled:
+                            trace.add("agent.first_token", time.perf_counter() - started)
+                        text += delta
+                        if kind == "chat":
+                            print(delta, end="", flush=True)
+                            continue
+                        kind = self.classify_reply(text)
+                        if kind == "chat":
+                            print(f"💬 {text.lstrip()}", end="", flush=True)
+                        elif kind == "command":
+                            break
+                finally:
+                    stream.close()
+        except Exception as e:
+            if kind == "chat":
+                print()
+            print(f"❌ AI interpretation failed: {e}")
+            return (None, None)
+
+        reply = text.strip()
+        self.chat_history.append({"role": "assistant", "content": reply})
+        if kind == "chat":
+            print()
+            return ("chat", None)
+        command, value = self.parse_command(reply.split("\n", 1)[0])
+        if command == "chat":
+            print(f"💬 {reply}")
+            return ("chat", None)
+        return (command, value)
+
     def parse_command(self, reply_text):
-        text = reply_text.strip().lower()
-        parts = text.split(maxsplit=1)
+        parts = reply_text.strip().split(maxsplit=1)
         if not parts:
             return (None, None)
 
-        cmd = parts[0]
+        # Only the command word is case-insensitive; key names and paths are not.
+        cmd = parts[0].lower()
         arg = parts[1] if len(parts) > 1 else None
 
         if cmd in {"add", "list", "exit"}:
@@ -74,6 +265,7 @@ class SecAPIAgent:
             elif command == "rotate" and value:
                 rotate_key(value)
             elif command == "check" and value:
+                from secapi.scanner import scan_directory
                 print(f"\n🔍 Scanning directory: {value}\n")
                 findings = scan_directory(value)
                 if findings:
@@ -82,6 +274,7 @@ class SecAPIAgent:
                 else:
                     print("✅ No secrets found.")
             elif command == "ai" and value:
+                from secapi.scanner_ai import ai_scan_path
                 ai_scan_path(value)
             elif command == "exit":
                 print("👋 Goodbye!")
@@ -100,12 +293,12 @@ class SecAPIAgent:
                 user_input = input("🗒️ What would you like to do? ").strip()
                 if not user_input:
                     continue
-                ai_reply = self.interpret_command(user_input)
-                if not ai_reply:
+                command, value = self.respond(user_input)
+                if command is None:
                     print("❌ AI could not process your request.")
                     continue
-                command, value = self.parse_command(ai_reply)
-                self.execute_command(command, value)
+                if command != "chat":  # Answers were printed as they streamed
+                    self.execute_command(command, value)
             except KeyboardInterrupt:
                 print("\n👋 Exiting. See you next time!")
                 break
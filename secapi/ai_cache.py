@@ -0,0 +1,85 @@
+# Content-addressed on-disk cache of AI scan results
+
+import hashlib
+import json
+import os
+import time
+
+from secapi.ai_engine import AI_MODEL, AI_TEMPERATURE, PROMPT_VERSION
+from secapi.scan_cache import CACHE_DIR, open_private
+
+# Least recently used entries are evicted past either limit.
+MAX_CACHE_BYTES = 64 << 20
+MAX_CACHE_AGE = 30 * 24 * 3600
+
+
+def cache_key(content, model=AI_MODEL, prompt_version=PROMPT_VERSION, temperature=AI_TEMPERATURE):
+    """Hashes a chunk together with everything else that shapes the model's reply."""
+    material = json.dumps([content, model, prompt_version, temperature], ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class AICache:
+    """
+    Stores the parsed findings for each chunk, one small JSON file per key.
+    A hit refreshes the entry's mtime, which `evict` uses as the LRU clock.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=MAX_CACHE_BYTES, max_age=MAX_CACHE_AGE):
+        self.root = os.path.join(cache_dir or CACHE_DIR, "ai")
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                findings = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [tuple(finding) for finding in findings]
+
+    def put(self, key, findings):
+        path = self._path(key)
+        try:
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open_private(tmp_path) as f:
+                json.dump(findings, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ Could not write AI cache: {e}")
+
+    def evict(self):
+        """Drops entries older than `max_age`, then the least recently used until under `max_bytes`."""
+        entries = []
+        try:
+            for prefix in os.scandir(self.root):
+                if prefix.is_dir(follow_symlinks=False):
+                    for entry in os.scandir(prefix.path):
+                        st = entry.stat(follow_symlinks=False)
+                        entries.append((st.st_mtime, st.st_size, entry.path))
+        except OSError:
+            return 0
+
+        entries.sort()
+        cutoff = time.time() - self.max_age
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, path in entries:
+            if mtime >= cutoff and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
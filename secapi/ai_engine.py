@@ -0,0 +1,117 @@
+# Concurrent request engine for the AI scanner
+
+import asyncio
+import email.utils
+import os
+import random
+import time
+
+from secapi import trace
+
+# The OpenAI SDK and the vault load on first request, so importing this module
+# (e.g. for the AI cache's key constants) stays cheap.
+
+AI_ENDPOINT = os.environ.get("SECAPI_AI_ENDPOINT", "https://models.github.ai/inference")
+AI_MODEL = "openai/gpt-4.1"
+AI_TEMPERATURE = 0.2
+
+# Requests in flight at once, and retries for rate-limited or failed requests.
+MAX_CONCURRENCY = 8
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+# Bump whenever SYSTEM_PROMPT changes in a way that changes the replies.
+PROMPT_VERSION = 3
+
+SYSTEM_PROMPT = """
+You are a source code security auditor.
+
+Your job is to scan the code for hardcoded secrets or insecure API key usage.
+The code may hold several files. Each one starts with a header `📄 <k>: <filename> (lines ...)`
+and each of its lines is prefixed with its line number and `| `; report that number.
+❌ Do NOT return lines that already use secure retrieval methods like `load_key(...)` or environment variables like `os.environ[...]`.
+
+✅ Only return lines that directly assign hardcoded secrets.
+
+Output format (strict):
+📄 <k>
+🧪 <line_number>: <variable_name> = <secret_string>
+
+Repeat a file's `📄 <k>` header before its issues; skip files without issues.
+Only return one line per issue. No explanations.
+"""
+
+
+def create_client():
+    """Creates the one pooled client shared by every request in a run."""
+    from openai import AsyncOpenAI
+    from secapi.secure import load_key
+    return AsyncOpenAI(base_url=AI_ENDPOINT, api_key=load_key("gt_token"), max_retries=0)
+
+
+def retry_delay(response, attempt):
+    """
+    Returns how long to wait before retrying, honouring the server's
+    `retry-after-ms` / `Retry-After` headers (seconds or an HTTP date) and
+    falling back to exponential backoff with jitter.
+    """
+    headers = response.headers if response is not None else {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                when = email.utils.parsedate_to_datetime(value)
+                return max(0.0, when.timestamp() - time.time())
+    except (TypeError, ValueError):
+        pass
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * (0.5 + random.random() / 2)
+
+
+async def complete(client, semaphore, messages):
+    """Sends one chat request, retrying on 429 and server errors."""
+    import openai
+    async with semaphore:
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                with trace.span("ai.request", sum(len(message["content"]) for message in messages)):
+                    response = await client.chat.completions.create(
+                        messages=messages,
+                        model=AI_MODEL,
+                        temperature=AI_TEMPERATURE,
+                        top_p=1.0,
+                    )
+                return response.choices[0].message.content or ""
+            except (openai.RateLimitError, openai.InternalServerError) as e:
+                if attempt == MAX_RETRIES:
+                    raise
+                await asyncio.sleep(retry_delay(e.response, attempt))
+
+
+async def _complete_all(requests, concurrency, client):
+    owns_client = client is None
+    client = client or create_client()
+    semaphore = asyncio.Semaphore(concurrency)
+    try:
+        return await asyncio.gather(
+            *(complete(client, semaphore, messages) for messages in requests),
+            return_exceptions=True,
+        )
+    finally:
+        if owns_client:
+            await client.close()
+
+
+def complete_all(requests, concurrency=MAX_CONCURRENCY, client=None):
+    """
+    Sends every request (a list of chat messages) with at most `concurrency`
+    in flight and returns the replies in order. A request that ultimately
+    fails yields its exception instead of a reply.
+    """
+    if not requests:
+        return []
+    return asyncio.run(_complete_all(requests, concurrency, client))
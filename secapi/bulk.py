@@ -0,0 +1,113 @@
+# Bulk vault operations: run a command with keys in its environment, and
+# import or export many keys with one prompt and one vault write
+
+import json
+import os
+import re
+import sys
+
+from secapi.secure import key_names, load_keys, store_secrets
+
+_ENV_LINE = re.compile(r"^\s*(?:export\s+)?([A-Za-z_][A-Za-z0-9_.\-]*)\s*=\s*(.*?)\s*$")
+
+
+def env_name(key_name):
+    """The environment variable a vault key is exposed as: `openai-key` -> `OPENAI_KEY`."""
+    return re.sub(r"[^A-Za-z0-9_]", "_", key_name).upper()
+
+
+def _unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] == "'":
+        return value[1:-1]
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return re.sub(r'\\(["\\n])', lambda m: "\n" if m.group(1) == "n" else m.group(1), value[1:-1])
+    return re.sub(r"\s+#.*$", "", value)
+
+
+def parse_env(text):
+    """Parses `.env` text (`KEY=value`, optional `export`, quotes and comments) into a dict."""
+    entries = {}
+    for line in text.splitlines():
+        match = _ENV_LINE.match(line)
+        if match and not line.lstrip().startswith("#"):
+            entries[match.group(1)] = _unquote(match.group(2))
+    return entries
+
+
+def read_secrets_file(path):
+    """Reads a `.json` object or a `.env` file of name -> secret."""
+    with open(path, 'r') as f:
+        text = f.read()
+    if path.endswith(".json"):
+        data = json.loads(text)
+        if not isinstance(data, dict):
+            raise ValueError("Expected a JSON object of key names to values.")
+        return {name: value if isinstance(value, str) else json.dumps(value) for name, value in data.items()}
+    return parse_env(text)
+
+
+def _dotenv_quote(value):
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+
+
+def import_secrets(path):
+    """Encrypts every secret in a `.env` or JSON file and stores them in one vault write."""
+    try:
+        secrets = {name: value for name, value in read_secrets_file(path).items() if value}
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not read '{path}': {e}")
+        return
+    if not secrets:
+        print(f"❌ No secrets found in '{path}'.")
+        return
+
+    existing = set(key_names())
+    overwritten = sum(1 for name in secrets if name in existing)
+    store_secrets(secrets)
+
+    print(f"✅ Imported {len(secrets)} keys from '{path}'" + (f" ({overwritten} overwritten)." if overwritten else "."))
+    print(f"⚠️ '{path}' still holds them in plain text; delete it once you have checked the import.")
+
+
+def export_secrets(path=None, names=None):
+    """Decrypts the vault (or just `names`) in one pass and writes them as `.env`, or JSON for a `.json` path."""
+    names = names or key_names()
+    values = dict(zip(names, load_keys(names)))
+    if path and path.endswith(".json"):
+        text = json.dumps(values, indent=2) + "\n"
+    else:
+        text = "".join(f"{name}={_dotenv_quote(value)}\n" for name, value in values.items())
+
+    if not path:
+        sys.stdout.write(text)
+        return
+    # A new file is created 0600 and renamed over `path`, so exporting over
+    # an existing, more open file never leaves the secrets readable by others.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    print(f"✅ Exported {len(values)} keys to '{path}' (plain text, readable only by you).")
+
+
+def exec_with_keys(command, names=None):
+    """
+    Replaces this process with `command`, with the requested keys (or every
+    key) decrypted in one pass and added to its environment in UPPER_CASE.
+    """
+    if not command:
+        print("❌ Please provide a command after `--`, e.g. `secapi exec --all -- python app.py`.")
+        sys.exit(2)
+    names = names or key_names()
+    env = dict(os.environ)
+    env.update((env_name(name), value) for name, value in zip(names, load_keys(names)))
+    try:
+        os.execvpe(command[0], command, env)
+    except OSError as e:
+        print(f"❌ Could not run '{command[0]}': {e}")
+        sys.exit(127)
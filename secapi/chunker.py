@@ -0,0 +1,175 @@
+# Splits files into line-aligned windows for the AI scanner and picks the
+# ones worth sending
+
+import re
+
+from secapi.scanner import scan_text
+
+# Rough token budget per chunk, at about four characters per token, and how
+# many lines consecutive chunks share so a secret near a boundary keeps its
+# context.
+CHUNK_TOKENS = 1500
+CHUNK_OVERLAP = 5
+CHARS_PER_TOKEN = 4
+
+# A line longer than a chunk is split into column windows that share this
+# many characters, so a secret crossing a split is whole in one of them.
+COLUMN_OVERLAP = 256
+
+# Small chunks are packed together into one request up to this many tokens.
+BATCH_TOKENS = 4000
+BATCH_CHUNKS = 16
+
+# A quoted literal of 8+ characters assigned to a name that sounds sensitive.
+_SENSITIVE_ASSIGNMENT = re.compile(
+    r"(?i)(?:key|secret|token|passw(?:or)?d|pwd|auth|credential|private)[\w\-]*[\"']?\s*[:=]\s*"
+    r"[\"'][^\"'\s]{8,}[\"']"
+)
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class Chunk:
+    """
+    A window of consecutive lines of `path`, starting at 1-based line
+    `start`. A chunk cut from a line too long for one holds that single
+    line from 0-based `column` on.
+    """
+
+    __slots__ = ("path", "start", "lines", "column")
+
+    def __init__(self, path, start, lines, column=0):
+        self.path = path
+        self.start = start
+        self.lines = lines
+        self.column = column
+
+    @property
+    def end(self):
+        return self.start + len(self.lines) - 1
+
+    @property
+    def location(self):
+        """Where the chunk is in its file, e.g. `lines 3-40` or `line 7, columns 5745-11744`."""
+        if self.column:
+            return f"line {self.start}, columns {self.column + 1}-{self.column + len(self.lines[0])}"
+        return f"lines {self.start}-{self.end}"
+
+    def covers(self, line_num, column):
+        """Whether the character at 0-based `column` of file line `line_num` is in this chunk."""
+        if not self.start <= line_num <= self.end:
+            return False
+        return self.start != self.end or self.column <= column < self.column + len(self.lines[0])
+
+    def render(self):
+        """The chunk's text with each line numbered from 1, as sent to the model."""
+        return "\n".join(f"{i}| {line}" for i, line in enumerate(self.lines, 1))
+
+    def to_file_line(self, chunk_line):
+        """Maps a line number reported for this chunk back onto the file, or None."""
+        if 1 <= chunk_line <= len(self.lines):
+            return self.start + chunk_line - 1
+        return None
+
+
+def windows(lines, budget=CHUNK_TOKENS, overlap=CHUNK_OVERLAP):
+    """
+    Yields `(start, end)` index ranges covering every line, each fitting the
+    token budget, with `overlap` lines shared between neighbours. A single
+    line over budget gets a window to itself.
+    """
+    start = 0
+    while start < len(lines):
+        end, used = start, 0
+        while end < len(lines):
+            cost = estimate_tokens(lines[end])
+            if end > start and used + cost > budget:
+                break
+            used += cost
+            end += 1
+        yield start, end
+        if end >= len(lines):
+            return
+        start = max(start + 1, end - overlap)
+
+
+def column_windows(line, max_chars, overlap=COLUMN_OVERLAP):
+    """
+    Yields `(column, text)` slices covering every character of an over-long
+    line, each at most `max_chars` long, with `overlap` characters shared
+    between neighbours.
+    """
+    step = max(1, max_chars - overlap)
+    column = 0
+    while True:
+        yield column, line[column:column + max_chars]
+        if column + max_chars >= len(line):
+            return
+        column += step
+
+
+def candidate_positions(text):
+    """
+    Returns `(line_num, column)` for every spot that looks like it could
+    hold a secret: anything the regex/entropy scanner flags, plus quoted
+    literals assigned to sensitive-sounding names. Line numbers are 1-based
+    and columns 0-based.
+    """
+    found = {(line_num, start) for line_num, _, _, start, _ in scan_text(text)}
+    line_num, counted_to = 1, 0
+    for match in _SENSITIVE_ASSIGNMENT.finditer(text):
+        line_num += text.count("\n", counted_to, match.start())
+        counted_to = match.start()
+        found.add((line_num, match.start() - text.rfind("\n", 0, match.start()) - 1))
+    return found
+
+
+def chunk_text(path, text, budget=CHUNK_TOKENS, overlap=CHUNK_OVERLAP, prefilter=True):
+    """
+    Splits `text` into chunks and returns `(candidates, total)`: the chunks
+    containing at least one candidate position (or all of them when
+    `prefilter` is off) and the total number of chunks. A line too long for
+    one chunk is split into column windows, so nothing past the budget is
+    cut off.
+    """
+    lines = text.split("\n")
+    if lines and lines[-1] == "":
+        lines.pop()
+    max_chars = budget * CHARS_PER_TOKEN
+    chunks, run_start = [], 0
+    for i in range(len(lines) + 1):
+        if i < len(lines) and len(lines[i]) <= max_chars:
+            continue
+        run = lines[run_start:i]
+        chunks += [Chunk(path, run_start + start + 1, run[start:end]) for start, end in windows(run, budget, overlap)]
+        if i < len(lines):
+            chunks += [Chunk(path, i + 1, [part], column) for column, part in column_windows(lines[i], max_chars)]
+        run_start = i + 1
+    if not prefilter:
+        return chunks, len(chunks)
+    interesting = candidate_positions(text)
+    candidates = [
+        chunk for chunk in chunks
+        if any(chunk.covers(line_num, column) for line_num, column in interesting)
+    ]
+    return candidates, len(chunks)
+
+
+def pack(chunks, budget=BATCH_TOKENS, max_chunks=BATCH_CHUNKS):
+    """
+    Groups consecutive chunks into batches of at most `budget` estimated
+    tokens and `max_chunks` chunks. A chunk over budget is sent on its own;
+    a budget of 0 puts every chunk in its own batch.
+    """
+    batch, used = [], 0
+    for chunk in chunks:
+        cost = estimate_tokens(chunk.render())
+        if batch and (used + cost > budget or len(batch) >= max_chunks):
+            yield batch
+            batch, used = [], 0
+        batch.append(chunk)
+        used += cost
+    if batch:
+        yield batch
@@ -1,10 +1,79 @@
+# Each command imports only what it uses, so vault commands start without
+# loading the scanner or the OpenAI SDK. Keep module-level imports light.
 import argparse
-from secapi.scanner import scan_directory
-from secapi.fixer import suggest_and_fix
-from secapi.secure import load_key, list_keys, delete_key, rotate_key, change_vault_password  # assuming you also move these here
-from secapi.scanner_ai import ai_scan_path
-from secapi.secure import add_key_interactively
-from secapi.agent import run_agent
+import sys
+
+def entropy_detector(args):
+    from secapi.entropy import DEFAULT_ENTROPY, EntropyDetector
+    if args.no_entropy:
+        return None
+    if args.entropy_charset == "both" and args.entropy_threshold is None:
+        return DEFAULT_ENTROPY
+    thresholds = {}
+    if args.entropy_threshold is not None:
+        thresholds = {"hex_threshold": args.entropy_threshold, "base64_threshold": args.entropy_threshold}
+    return EntropyDetector(charset=args.entropy_charset, **thresholds)
+
+
+def check_staged(repo, output_format, entropy):
+    """Reports secrets in staged changes and returns the process exit code."""
+    from subprocess import CalledProcessError
+    from secapi.staged import iter_staged_findings
+    try:
+        findings = iter_staged_findings(repo, entropy)
+        if output_format == "jsonl":
+            from secapi.report import write_jsonl
+            return 1 if write_jsonl(findings, sys.stdout) else 0
+        if output_format == "sarif":
+            from secapi.report import write_sarif
+            return 1 if write_sarif(findings, sys.stdout) else 0
+
+        count = 0
+        for finding in findings:
+            count += 1
+            print(f"[{count}] 🔑 Potential secret in {finding.path} at line {finding.line}:")
+            print(f"    {finding.content}")
+            print(f"    ➤ Matched pattern: {finding.label}\n")
+    except CalledProcessError as e:
+        detail = e.stderr.decode(errors='replace').strip().splitlines()[0] if e.stderr else e
+        print(f"❌ Failed to read staged changes: {detail}")
+        return 2
+    if count:
+        print("❌ Commit blocked: remove the secrets above or move them to the vault with `secapi add`.")
+        return 1
+    return 0
+
+
+def check_history(repo, output_format, entropy):
+    """Reports secrets anywhere in the git history and returns the process exit code."""
+    from subprocess import CalledProcessError
+    from secapi.history import iter_history_findings
+    from secapi.report import write_jsonl, write_sarif
+    findings = iter_history_findings(repo, entropy)
+    try:
+        if output_format == "jsonl":
+            return 1 if write_jsonl(findings, sys.stdout) else 0
+        if output_format == "sarif":
+            return 1 if write_sarif(findings, sys.stdout) else 0
+
+        print(f"\n🕰️ Scanning git history: {repo}\n")
+        count = 0
+        for finding in findings:
+            count += 1
+            commits = {commit for commit, _ in finding.occurrences}
+            print(f"[{count}] 🔑 Potential secret in {finding.path} at line {finding.line} (blob {finding.blob[:10]}):")
+            print(f"    {finding.content}")
+            print(f"    ➤ Matched pattern: {finding.label}")
+            print(f"    ➤ Present in {len(commits)} commit(s), e.g. {', '.join(sorted(commits)[:3])}\n")
+    except CalledProcessError as e:
+        print(f"❌ Failed to read git history: {e.stderr.strip() if e.stderr else e}")
+        return 2
+    if count:
+        print("⚠️ Secrets in history stay exposed even after removal. Rotate them with `secapi rotate <key>`.")
+        return 1
+    print("✅ No secrets found in history.")
+    return 0
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -13,33 +82,127 @@ def main():
     parser.add_argument(
         "command", metavar="command", type=str,
         choices=[
-            "check", "list", "delete", "rotate", "load", "ai", "add", "agent", "change-password"
+            "check", "list", "delete", "rotate", "load", "ai", "add", "agent", "change-password",
+            "unlock", "lock", "exec", "import", "export"
         ],
-        help="Command to run: check <dir> | list | delete <key_name> | rotate <key_name> | load <key_name> | agent | change-password"
+        help="Command to run: check <dir> | list | delete <key_name> | rotate <key_name> | load <key_name> | agent | change-password | unlock | lock"
+             " | exec -- <cmd> | import <file> | export [file]"
     )
     parser.add_argument("value", nargs="?", help="Path, key name, or file depending on the command.")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1,
+        help="check: number of worker processes to scan with (0 = one per CPU)."
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=8,
+        help="ai: maximum number of AI requests in flight at once."
+    )
+    parser.add_argument(
+        "--keys",
+        help="exec/export: comma-separated key names to use (default: every key in the vault)."
+    )
+    parser.add_argument(
+        "--all", action="store_true",
+        help="exec/export: use every key in the vault."
+    )
+    parser.add_argument(
+        "--ttl", type=int, default=15 * 60,
+        help="unlock: seconds the agent keeps the vault unlocked (default: 900)."
+    )
+    parser.add_argument(
+        "--batch-tokens", type=int,
+        help="ai: pack small chunks into one request up to this many tokens (default: 4000; 0 = one chunk per request)."
+    )
+    parser.add_argument(
+        "--no-prefilter", action="store_true",
+        help="ai: send every chunk to the model, not just those with a likely secret."
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="check/ai: rescan every file instead of reusing results for unchanged files or chunks."
+    )
+    parser.add_argument(
+        "--format", choices=["text", "jsonl", "sarif"], default="text",
+        help="check: output format. jsonl and sarif only report findings, without fixing."
+    )
+    parser.add_argument(
+        "--no-entropy", action="store_true",
+        help="check: disable the high-entropy string detector."
+    )
+    parser.add_argument(
+        "--entropy-charset", choices=["hex", "base64", "both"], default="both",
+        help="check: which kinds of high-entropy strings to report."
+    )
+    parser.add_argument(
+        "--entropy-threshold", type=float,
+        help="check: minimum entropy to report, as a fraction of a random string's of the same length "
+             "and charset (default: 0.95 for hex, 0.92 for base64)."
+    )
+    parser.add_argument(
+        "--auto", action="store_true",
+        help="check: fix every quoted secret without prompting, naming keys after their variables."
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true",
+        help="check: print the fixes as a unified diff without changing any file or the vault."
+    )
+    parser.add_argument(
+        "--history", action="store_true",
+        help="check: scan every blob in the git history of the given repository."
+    )
+    parser.add_argument(
+        "--staged", action="store_true",
+        help="check: scan only lines added in the git index; exits 1 if anything is found."
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="Print where the time went (per phase, plus the slowest files) to stderr when done."
+    )
+    parser.add_argument(
+        "--metrics-out", metavar="PATH",
+        help="Write the same timings to PATH: Prometheus textfile format for *.prom, JSON otherwise."
+    )
 
-    args = parser.parse_args()
+    # Everything after `--` is the command for `secapi exec`.
+    argv = sys.argv[1:]
+    child = []
+    if "--" in argv:
+        split = argv.index("--")
+        argv, child = argv[:split], argv[split + 1:]
+    args = parser.parse_intermixed_args(argv)
+    if args.jobs < 0:
+        parser.error("--jobs must be 0 (one per CPU) or a positive number of workers")
+    names = [name.strip() for name in args.keys.split(",") if name.strip()] if args.keys and not args.all else None
+    if args.profile or args.metrics_out:
+        import atexit
+        from secapi import trace
+        trace.enable()
+        atexit.register(trace.finish, args.profile, args.metrics_out)
 
     if args.command == "agent":
+        from secapi.agent import run_agent
         run_agent()
 
     elif args.command == "list":
+        from secapi.secure import list_keys
         list_keys()
     elif args.command == "delete":
         if not args.value:
             print("❌ Please provide a key name to delete.")
             return
+        from secapi.secure import delete_key
         delete_key(args.value)
     elif args.command == "rotate":
         if not args.value:
             print("❌ Please provide a key name to rotate.")
             return
+        from secapi.secure import rotate_key
         rotate_key(args.value)
     elif args.command == "load":
         if not args.value:
             print("❌ Please provide a key name to load.")
             return
+        from secapi.secure import load_key
         value = load_key(args.value)
         print(f"🔓 Value for '{args.value}': {value}")
     
@@ -47,29 +210,93 @@ def main():
         if not args.value:
             print("❌ Please provide a file path to scan with AI.")
             return
-        ai_scan_path(args.value)
+        from secapi.chunker import BATCH_TOKENS
+        from secapi.scanner_ai import ai_scan_path
+        batch_tokens = BATCH_TOKENS if args.batch_tokens is None else args.batch_tokens
+        ai_scan_path(args.value, concurrency=args.concurrency, prefilter=not args.no_prefilter,
+                     cache=not args.no_cache, batch_tokens=batch_tokens)
 
     elif args.command == "add":
+        from secapi.secure import add_key_interactively
         add_key_interactively()
         return
     elif args.command == "change-password":
+        from secapi.secure import change_vault_password
         change_vault_password()
         return
+    elif args.command == "import":
+        if not args.value:
+            print("❌ Please provide a .env or .json file to import.")
+            return
+        from secapi.bulk import import_secrets
+        import_secrets(args.value)
+        return
+    elif args.command in ("export", "exec"):
+        from secapi.bulk import exec_with_keys, export_secrets
+        try:
+            if args.command == "export":
+                export_secrets(args.value, names)
+            else:
+                exec_with_keys(child, names)
+        except (FileNotFoundError, KeyError) as e:
+            print(f"❌ {e.args[0] if e.args else e}")
+            sys.exit(1)
+        return
+    elif args.command == "unlock":
+        from secapi import unlock_agent
+        from secapi.secure import fingerprint_key, get_fernet, VAULT_PATH
+        if unlock_agent.start(get_fernet(), VAULT_PATH, args.ttl, fingerprint_key()):
+            duration = f"{args.ttl // 60} min" if args.ttl >= 60 else f"{args.ttl} s"
+            print(f"🔓 Vault unlocked for {duration}. Run `secapi lock` to lock it now.")
+        return
+    elif args.command == "lock":
+        from secapi import unlock_agent
+        if unlock_agent.stop():
+            print("🔒 Vault locked.")
+        else:
+            print("🔒 No unlock agent was running.")
+        return
     elif args.command == "check":
+        if args.history:
+            sys.exit(check_history(args.value or ".", args.format, entropy_detector(args)))
+        if args.staged:
+            sys.exit(check_staged(args.value or ".", args.format, entropy_detector(args)))
         if not args.value:
             print("❌ Please provide a directory path to scan.")
             return
+        from secapi.report import write_jsonl, write_sarif
+        from secapi.scanner import iter_findings
+        findings = iter_findings(
+            args.value, jobs=args.jobs, cache=not args.no_cache, entropy=entropy_detector(args)
+        )
+        if args.format == "jsonl":
+            sys.exit(1 if write_jsonl(findings, sys.stdout) else 0)
+        if args.format == "sarif":
+            sys.exit(1 if write_sarif(findings, sys.stdout, root=args.value) else 0)
+
         print(f"\n🔍 Scanning directory: {args.value}\n")
-        findings = scan_directory(args.value)
-        if not findings:
+        from secapi.remediate import finding_secret
+        reported = []
+        vaulted = None
+        for idx, finding in enumerate(findings):
+            if vaulted is None:
+                # Only known while the vault is unlocked, e.g. by `secapi unlock`.
+                from secapi.secure import vaulted_lookup
+                vaulted = vaulted_lookup() or (lambda secret: None)
+            secret = finding_secret(finding)
+            key_name = secret and vaulted(secret)
+            print(f"[{idx + 1}] 🔑 Potential secret in {finding.path} at line {finding.line}:")
+            print(f"    {finding.content}")
+            print(f"    ➤ Matched pattern: {finding.label}")
+            if key_name:
+                print(f"    🔁 Already vaulted as '{key_name}'")
+            print(flush=True)
+            reported.append(finding)
+        if not reported:
             print("✅ No secrets found. You're all clean!")
             return
-        for idx, (file, line_num, line_content, match) in enumerate(findings):
-            print(f"[{idx + 1}] 🔑 Potential secret in {file} at line {line_num}:")
-            print(f"    {line_content.strip()}")
-            print(f"    ➤ Matched pattern: {match}\n")
-        for finding in findings:
-            suggest_and_fix(*finding)
+        from secapi.remediate import remediate
+        remediate(reported, "dry-run" if args.dry_run else "auto" if args.auto else "interactive")
 
 if __name__ == "__main__":
     main()
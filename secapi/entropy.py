@@ -0,0 +1,222 @@
+# Shannon-entropy detector for secrets that match no known pattern
+
+import math
+import re
+from collections import Counter
+
+ENTROPY_LABEL = "High Entropy"
+
+# String literals, and unquoted `key=value` / `key: value` values at the end
+# of a line (as in .env and YAML files), made only of base64/hex characters.
+_TOKEN_PATTERN = (
+    r"[\"'`]([A-Za-z0-9+/=_\-]{%(min)d,%(max)d})[\"'`]"
+    r"|[=:][ \t]*([A-Za-z0-9+/=_\-]{%(min)d,%(max)d})[ \t]*\r?$"
+)
+# Maps token characters to "a", newlines to themselves and everything else to
+# a space, so runs long enough to be a token are found with `bytes.find`.
+_RUNS = bytes(
+    ord("a") if chr(c) in "+/=_-" or chr(c).isascii() and chr(c).isalnum() else c if c == 10 else ord(" ")
+    for c in range(256)
+)
+# The buffer is translated this many bytes at a time, up to the next newline,
+# so a mapped file is never copied whole.
+RUNS_WINDOW = 1 << 20
+_HEX = re.compile(rb"[0-9a-fA-F]+")
+# Subresource-integrity hashes in lockfiles are random by design.
+_IGNORED = re.compile(rb"sha(?:1|256|384|512)-")
+
+# Tokens are scored this many at a time to bound the histogram matrix.
+SCORE_BATCH = 2048
+# NumPy is imported once a process has scored this many tokens, which pays
+# for the import; from then on it scores any batch of NUMPY_MIN_BATCH or more.
+NUMPY_MIN_TOKENS = 256
+NUMPY_MIN_BATCH = 2
+
+_np = None
+_tokens_scored = 0
+
+# Expected entropy of a uniformly random string, by (length, alphabet size).
+_expected = {}
+
+
+def _numpy():
+    """Imports NumPy on first use; returns None when it is not installed."""
+    global _np
+    if _np is None:
+        try:
+            import numpy
+            _np = numpy
+        except ImportError:  # NumPy is optional; scoring falls back to pure Python
+            _np = False
+    return _np or None
+
+
+def shannon_entropy(tokens):
+    """
+    Returns the Shannon entropy (bits per character) of each token in
+    `tokens`, a list of bytes. With NumPy every batch is scored with a single
+    byte histogram instead of a per-character loop.
+    """
+    global _tokens_scored
+    _tokens_scored += len(tokens)
+    np = _numpy() if _tokens_scored >= NUMPY_MIN_TOKENS and len(tokens) >= NUMPY_MIN_BATCH else None
+    if np is None:
+        return [_entropy_py(token) for token in tokens]
+    scores = []
+    for offset in range(0, len(tokens), SCORE_BATCH):
+        scores.extend(_entropy_np(np, tokens[offset:offset + SCORE_BATCH]).tolist())
+    return scores
+
+
+def _entropy_py(token):
+    length = len(token)
+    if not length:
+        return 0.0
+    return math.log2(length) - sum(c * math.log2(c) for c in Counter(token).values()) / length
+
+
+def expected_entropy(length, alphabet):
+    """
+    The mean Shannon entropy (bits per character) of a uniformly random
+    string of `length` characters drawn from `alphabet` symbols. Short
+    strings fall well short of log2(alphabet), since they cannot use every
+    symbol, so this is what a random token's score is compared against.
+    """
+    key = (length, alphabet)
+    value = _expected.get(key)
+    if value is None:
+        # E[sum c*log2(c)] over the alphabet, with each count c ~ Binomial(length, 1/alphabet).
+        p = 1 / alphabet
+        pmf, total = (1 - p) ** length, 0.0
+        for count in range(1, length + 1):
+            pmf *= (length - count + 1) / count * p / (1 - p)
+            total += pmf * count * math.log2(count)
+        value = _expected[key] = math.log2(length) - alphabet * total / length
+    return value
+
+
+def _entropy_np(np, tokens):
+    count = len(tokens)
+    lengths = np.fromiter(map(len, tokens), dtype=np.int64, count=count)
+    data = np.frombuffer(b"".join(tokens), dtype=np.uint8)
+    rows = np.repeat(np.arange(count, dtype=np.int64), lengths)
+    # One histogram bin per (token, byte) pair. Since sum(c * log2(c)) over a
+    # token's bins equals the sum of log2(c) over its characters, the
+    # per-token sums come from a weighted bincount over the characters.
+    keys = (rows << 8) | data
+    histogram = np.bincount(keys, minlength=count << 8)
+    weighted = np.bincount(rows, weights=np.log2(histogram[keys]), minlength=count)
+    safe_lengths = np.maximum(lengths, 1)
+    return np.log2(safe_lengths) - weighted / safe_lengths
+
+
+class EntropyDetector:
+    """
+    Flags string literals whose entropy is close to that of a random string
+    of the same length and charset. Thresholds are fractions of
+    `expected_entropy` for 16 (hex) or 64 (base64) symbols, so a 20-character
+    key and a 200-character one are held to the same standard; `charset`
+    selects which of "hex", "base64" or "both" are reported.
+
+    About 98% of random base64 tokens score at least 0.92, and identifiers
+    like `get_user_account_settings` stay under 0.9. Hex gets a higher bar
+    because commit hashes and digests are hex too: about 80% of random
+    20-character hex tokens and 95% of 40-character ones reach 0.95.
+    """
+
+    def __init__(self, hex_threshold=0.95, base64_threshold=0.92, charset="both", min_length=20, max_length=256):
+        if charset not in ("hex", "base64", "both"):
+            raise ValueError(f"Unknown entropy charset '{charset}'.")
+        self.hex_threshold = hex_threshold
+        self.base64_threshold = base64_threshold
+        self.charset = charset
+        self.min_length = min_length
+        self.max_length = max_length
+        pattern = _TOKEN_PATTERN % {"min": min_length, "max": max_length}
+        self._token_re = re.compile(pattern, re.M)
+        self._token_re_bytes = re.compile(pattern.encode(), re.M)
+        self._limits = {}  # (length, is_hex) -> minimum entropy to report
+
+    def signature(self):
+        """Identifies the settings, for invalidating cached scan results."""
+        return [self.hex_threshold, self.base64_threshold, self.charset, self.min_length, self.max_length]
+
+    def _token_lines(self, buf):
+        """
+        Yields `(start, end)` ranges of the lines of `buf` holding a run of
+        at least `min_length` token characters, merging neighbouring lines;
+        no other line can hold a token. Finding them with `translate` and
+        `find` is many times faster than letting the token regex try every
+        position of the file.
+        """
+        if isinstance(buf, str):
+            if not buf.isascii():
+                yield 0, len(buf)
+                return
+            buf = buf.encode("ascii")
+        needle = b"a" * self.min_length
+        pos, size = 0, len(buf)
+        while pos < size:
+            cut = size
+            if pos + RUNS_WINDOW < size:
+                # Windows end at a newline, so each line is whole in one of them.
+                cut = buf.find(b"\n", pos + RUNS_WINDOW) + 1 or size
+            for start, end in self._run_lines(buf[pos:cut].translate(_RUNS), needle):
+                yield pos + start, pos + end
+            pos = cut
+
+    @staticmethod
+    def _run_lines(runs, needle):
+        """`_token_lines` for one translated window."""
+        hit = runs.find(needle)
+        while hit != -1:
+            start = runs.rfind(b"\n", 0, hit) + 1
+            while True:
+                end = runs.find(b"\n", hit)
+                if end == -1:
+                    yield start, len(runs)
+                    return
+                hit = runs.find(needle, end)
+                if hit == -1 or runs.rfind(b"\n", end + 1, hit) != -1:
+                    break  # The next run is not on the following line
+            yield start, end
+
+    def tokens(self, buf):
+        """Yields `(start, end, token)` for every candidate literal in `buf`."""
+        token_re = self._token_re if isinstance(buf, str) else self._token_re_bytes
+        for line_start, line_end in self._token_lines(buf):
+            for match in token_re.finditer(buf, line_start, line_end):
+                group = 1 if match.start(1) != -1 else 2
+                token = match.group(group)
+                yield match.start(group), match.end(group), token.encode() if isinstance(token, str) else token
+
+    def find(self, buf):
+        """Returns `(start, end)` offsets of every high-entropy token in `buf`."""
+        candidates = []
+        for start, end, token in self.tokens(buf):
+            if _IGNORED.match(token):
+                continue
+            is_hex = _HEX.fullmatch(token) is not None
+            if self.charset == "hex" and not is_hex or self.charset == "base64" and is_hex:
+                continue
+            candidates.append((start, end, token, is_hex))
+        if not candidates:
+            return []
+        scores = shannon_entropy([token for _, _, token, _ in candidates])
+        return [
+            (start, end)
+            for (start, end, _, is_hex), score in zip(candidates, scores)
+            if score >= self._limit(end - start, is_hex)
+        ]
+
+    def _limit(self, length, is_hex):
+        limit = self._limits.get((length, is_hex))
+        if limit is None:
+            limit = self._limits[length, is_hex] = (
+                self.hex_threshold * expected_entropy(length, 16) if is_hex
+                else self.base64_threshold * expected_entropy(length, 64)
+            )
+        return limit
+
+
+DEFAULT_ENTROPY = EntropyDetector()
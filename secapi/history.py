@@ -0,0 +1,164 @@
+# Git history scanner
+
+import os
+import subprocess
+
+from secapi.entropy import DEFAULT_ENTROPY
+from secapi.scanner import MAX_FILE_SIZE, Finding, looks_binary, scan_buffer, split_lone_cr
+from secapi.walker import SCAN_EXTENSIONS
+
+TREE_MODE = b"40000"
+BLOB_MODES = (b"100644", b"100755")
+
+
+class HistoryFinding(Finding):
+    """A Finding in a git blob, with every `(commit, path)` that contains it."""
+
+    __slots__ = ("blob", "occurrences")
+
+    def __init__(self, blob, occurrences, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.blob = blob
+        self.occurrences = occurrences
+
+    def to_dict(self):
+        data = super().to_dict()
+        data["blob"] = self.blob
+        data["occurrences"] = [{"commit": commit, "path": path} for commit, path in self.occurrences]
+        return data
+
+
+class CatFile:
+    """A long-lived `git cat-file --batch` process that objects are streamed through."""
+
+    def __init__(self, repo):
+        self.proc = subprocess.Popen(
+            ["git", "-C", repo, "cat-file", "--batch"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        )
+
+    def read(self, sha, max_size=None):
+        """
+        Returns `(type, data)` for an object. Objects larger than `max_size`
+        are drained from the pipe and returned with `data` set to None.
+        """
+        self.proc.stdin.write(sha.encode() + b"\n")
+        self.proc.stdin.flush()
+        header = self.proc.stdout.readline().split()
+        if len(header) != 3:
+            raise KeyError(f"Git object '{sha}' not found.")
+        obj_type, size = header[1].decode(), int(header[2])
+        if max_size is not None and size > max_size:
+            remaining = size
+            while remaining:
+                remaining -= len(self.proc.stdout.read(min(remaining, 1 << 20)))
+            data = None
+        else:
+            data = self.proc.stdout.read(size)
+        self.proc.stdout.read(1)  # Trailing newline after each object
+        return obj_type, data
+
+    def close(self):
+        self.proc.stdin.close()
+        self.proc.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _parse_tree(data):
+    """Yields `(mode, name, sha)` for each entry of a raw tree object."""
+    pos = 0
+    while pos < len(data):
+        space = data.index(b" ", pos)
+        nul = data.index(b"\0", space)
+        yield data[pos:space], data[space + 1:nul].decode("utf-8", errors="replace"), data[nul + 1:nul + 21].hex()
+        pos = nul + 21
+
+
+def _commit_tree(cat, commit):
+    _, data = cat.read(commit)
+    return data.split(b"\n", 1)[0].split()[1].decode()
+
+
+def _list_commits(repo):
+    result = subprocess.run(
+        ["git", "-C", repo, "rev-list", "--all"],
+        capture_output=True, text=True, check=True,
+    )
+    return result.stdout.split()
+
+
+def _collect_blobs(cat, tree, prefix, seen_trees, on_blob):
+    """Visits every blob under `tree`, skipping subtrees already visited."""
+    if tree in seen_trees:
+        return
+    seen_trees.add(tree)
+    _, data = cat.read(tree)
+    for mode, name, sha in _parse_tree(data):
+        if mode == TREE_MODE:
+            _collect_blobs(cat, sha, prefix + name + "/", seen_trees, on_blob)
+        elif mode in BLOB_MODES and name.endswith(SCAN_EXTENSIONS):
+            on_blob(sha, prefix + name)
+
+
+def _dirty_paths(cat, tree, dirty, memo):
+    """Returns `[(relative_path, blob)]` for the flagged blobs under `tree`."""
+    if tree in memo:
+        return memo[tree]
+    found = []
+    _, data = cat.read(tree)
+    for mode, name, sha in _parse_tree(data):
+        if mode == TREE_MODE:
+            found.extend((f"{name}/{path}", blob) for path, blob in _dirty_paths(cat, sha, dirty, memo))
+        elif sha in dirty and mode in BLOB_MODES:
+            found.append((name, sha))
+    memo[tree] = found
+    return found
+
+
+def iter_history_findings(repo, entropy=DEFAULT_ENTROPY):
+    """
+    Scans every blob reachable from any ref in `repo` and yields a
+    `HistoryFinding` for each match, attributed to all commits and paths that
+    contain the blob. `entropy` is the `EntropyDetector` run alongside the
+    patterns, or None.
+
+    Each unique tree and blob is read and scanned once, no matter how many
+    commits share it, through a single `git cat-file --batch` process.
+    """
+    repo = os.path.abspath(repo)
+    commits = _list_commits(repo)
+    with CatFile(repo) as cat:
+        roots = [(commit, _commit_tree(cat, commit)) for commit in commits]
+
+        scanned, seen_trees, records = set(), set(), {}
+
+        def on_blob(blob, path):
+            if blob in scanned:
+                return
+            scanned.add(blob)
+            _, data = cat.read(blob, max_size=MAX_FILE_SIZE)
+            if data and not looks_binary(data):
+                blob_records = scan_buffer(split_lone_cr(data), entropy)
+                if blob_records:
+                    records[blob] = blob_records
+
+        for _, tree in roots:
+            _collect_blobs(cat, tree, "", seen_trees, on_blob)
+
+        # Second pass, only for the few blobs that matched: find every commit
+        # and path containing them, revisiting only trees not yet resolved.
+        occurrences = {blob: [] for blob in records}
+        memo = {}
+        for commit, tree in roots:
+            for path, blob in _dirty_paths(cat, tree, records, memo):
+                occurrences[blob].append((commit, path))
+
+    for blob, blob_records in records.items():
+        path = occurrences[blob][0][1] if occurrences[blob] else blob
+        for line, content, label, column, start, end in blob_records:
+            yield HistoryFinding(blob, occurrences[blob], path, line, content, label, column, (start, end))
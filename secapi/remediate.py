@@ -0,0 +1,344 @@
+# Batched remediation: plans every fix first, then rewrites each file once and
+# the vault once
+
+import difflib
+import os
+import re
+
+from secapi.entropy import ENTROPY_LABEL
+
+# Only these files are rewritten in place; elsewhere `load_key(...)` is not
+# valid code, so their secrets are stored and the line is left for a human.
+REWRITE_EXTENSIONS = (".py",)
+
+# --auto leaves findings with these labels alone: an entropy hit is as likely
+# to be a hash or an ID as a secret, and a GUID is usually a client or tenant
+# ID. It also skips any match that covers only part of its string, such as a
+# `token=` parameter inside a URL.
+AUTO_SKIP_LABELS = {ENTROPY_LABEL, "Microsoft Graph"}
+
+IMPORT_LINE = "from secapi.secure import load_key\n"
+
+_QUOTED = re.compile(r"""(["'])((?:\\.|(?!\1).)*)\1""")
+_PREFIX = re.compile(r"(?<![\w])[bBrRuUfF]{1,2}$")
+_ASSIGNED_NAME = re.compile(r"""["']?([A-Za-z_][\w\-]*)["']?\s*[:=]\s*$""")
+_HAS_IMPORT = re.compile(r"^\s*from\s+secapi(?:\.secure)?\s+import\s+.*\bload_key\b", re.M)
+
+
+class Fix:
+    """One planned change: move the literal at `start:end` of a line into the vault."""
+
+    __slots__ = ("path", "line", "label", "start", "end", "secret", "key_name", "action", "vaulted", "reason")
+
+    def __init__(self, path, line, label, start, end, secret, key_name, action="replace", vaulted=False,
+                 reason=None):
+        self.path = path
+        self.line = line
+        self.label = label
+        self.start = start
+        self.end = end
+        self.secret = secret
+        self.key_name = key_name
+        self.action = action  # "replace", "store" (vault only) or "skip"
+        self.vaulted = vaulted  # Already in the vault under `key_name`
+        self.reason = reason  # Why a fix is skipped
+
+
+def _quoted_at(text, end=None):
+    """
+    Returns `(start, end, secret)` for the literal the match ends in, with
+    any `r`/`u` prefix inside the span, or a string saying why the literal
+    cannot be replaced by a call, or None if no literal holds the match.
+    """
+    for match in _QUOTED.finditer(text):
+        # A pattern such as Generic starts at the key's name, so the secret
+        # is the literal its match ends in.
+        if match.group(2) and (end is None or match.start() < end <= match.end()):
+            start = match.start()
+            if text[start - 1:start] in ("'", '"') or text[match.end():match.end() + 1] in ("'", '"'):
+                return "triple-quoted string"
+            prefix = _PREFIX.search(text, 0, start)
+            if prefix:
+                kind = prefix.group(0).lower()
+                if "b" in kind:
+                    return "bytes literal"
+                if "f" in kind:
+                    return "f-string"
+                start = prefix.start()
+            return start, match.end(), match.group(2)
+    return None
+
+
+def _match_bounds(finding):
+    """The finding's match as `(start, end)` within the original line, or None if unknown."""
+    span = getattr(finding, "span", (0, 0))
+    if not span[1]:
+        return None
+    # `span` is within the stripped line, `column` within the original one.
+    start = getattr(finding, "column", 1) - 1
+    return start, start + span[1] - span[0]
+
+
+def locate_secret(text, finding):
+    """
+    Returns `(start, end, secret)` for the quoted literal on the line that
+    the finding's match ends in, None if the secret is not quoted, or the
+    reason the literal cannot be rewritten.
+    """
+    bounds = _match_bounds(finding)
+    return _quoted_at(text, bounds and bounds[1])
+
+
+def finding_secret(finding):
+    """The quoted secret a finding points at, from the finding alone, or None."""
+    located = _quoted_at(finding.content, finding.span[1] or None)
+    return located[2] if isinstance(located, tuple) else None
+
+
+def covers_literal(finding, start, end, secret):
+    """Whether the finding's match spans the whole string, not just part of it."""
+    bounds = _match_bounds(finding)
+    if bounds is None:
+        return True
+    content_start = end - 1 - len(secret)
+    return bounds[0] <= content_start and bounds[1] >= end - 1
+
+
+def suggest_name(text, start, label):
+    """Names a key after what it is assigned to, else after its label."""
+    assigned = _ASSIGNED_NAME.search(text[:start])
+    base = assigned.group(1) if assigned else label
+    return re.sub(r"[^a-z0-9]+", "_", base.lower()).strip("_") or "secret"
+
+
+def unique_name(base, taken):
+    name, n = base, 2
+    while name in taken:
+        name, n = f"{base}_{n}", n + 1
+    return name
+
+
+def _read_lines(path):
+    """The file's lines with their endings, split on `\n` only, as the scanner counts them."""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        text = f.read()
+    lines = text.split("\n")
+    last = lines.pop()
+    return [line + "\n" for line in lines] + ([last] if last else [])
+
+
+def _import_index(lines):
+    """Where to add the import: after a shebang, encoding line, module docstring and `__future__` imports."""
+    i = 0
+    while i < len(lines) and (lines[i].startswith("#") or not lines[i].strip()):
+        i += 1
+    if i < len(lines) and lines[i].lstrip().startswith(('"""', "'''")):
+        quote = lines[i].lstrip()[:3]
+        if lines[i].count(quote) < 2:
+            i += 1
+            while i < len(lines) and quote not in lines[i]:
+                i += 1
+        i += 1
+    while i < len(lines) and lines[i].startswith("from __future__"):
+        i += 1
+    return i
+
+
+def _ask(prompt, default=None):
+    answer = input(f"{prompt} [{default}]: " if default else f"{prompt}: ").strip()
+    return answer or default
+
+
+class Plan:
+    """
+    Every fix for a set of findings, with each affected file read once.
+    Nothing is written until `apply`.
+    """
+
+    def __init__(self):
+        self.fixes = []
+        self.sources = {}  # path -> original lines
+        self.entries = {}  # key name -> secret, for the vault
+        self.left_out = []  # (finding, reason) for findings no fix could be planned for
+
+    def patched(self, path):
+        """The file's lines with every planned replacement applied."""
+        lines = list(self.sources[path])
+        fixes = [fix for fix in self.fixes if fix.path == path and fix.action == "replace"]
+        # Right to left, so earlier spans on the same line stay valid.
+        for fix in sorted(fixes, key=lambda fix: (fix.line, fix.start), reverse=True):
+            text = lines[fix.line - 1]
+            lines[fix.line - 1] = f'{text[:fix.start]}load_key("{fix.key_name}"){text[fix.end:]}'
+        if fixes and not _HAS_IMPORT.search("".join(lines)):
+            lines.insert(_import_index(lines), IMPORT_LINE)
+        return lines
+
+    def diff(self):
+        """The planned file changes as one unified diff."""
+        chunks = []
+        for path in self.sources:
+            name = os.path.relpath(path).replace(os.sep, "/")
+            chunks.extend(difflib.unified_diff(self.sources[path], self.patched(path), f"a/{name}", f"b/{name}"))
+        return "".join(chunks)
+
+    def summary(self):
+        counts = {}
+        for fix in self.fixes:
+            counts[fix.action] = counts.get(fix.action, 0) + 1
+        files = len({fix.path for fix in self.fixes if fix.action == "replace"})
+        reused = len({fix.key_name for fix in self.fixes if fix.vaulted and fix.action != "skip"})
+        return (f"{counts.get('replace', 0)} replacements in {files} files, "
+                f"{counts.get('store', 0)} stored only, {counts.get('skip', 0)} skipped, "
+                f"{len(self.entries)} new vault keys, {reused} reused, {len(self.left_out)} left for you")
+
+    def apply(self):
+        """Encrypts every new key and commits them in one vault write, then rewrites each file once."""
+        from secapi.secure import store_secrets
+
+        if self.entries:
+            store_secrets(self.entries)
+            print(f"✅ Stored {len(self.entries)} keys in the vault.")
+
+        for path in self.sources:
+            if not any(fix.path == path and fix.action == "replace" for fix in self.fixes):
+                continue
+            try:
+                _write_if_unchanged(path, self.sources[path], self.patched(path))
+                print(f"✅ Updated '{path}'.")
+            except (OSError, ValueError) as e:
+                print(f"❌ Failed to update '{path}': {e}")
+
+
+def _write_if_unchanged(path, original, lines):
+    """Atomically replaces `path` with `lines`, unless it changed since it was read."""
+    if _read_lines(path) != original:
+        raise ValueError("file changed since it was scanned; rescan and try again")
+    tmp_path = f"{path}.secapi-{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def build_plan(findings, mode="interactive"):
+    """
+    Plans a fix for each finding. `interactive` asks what to do and what to
+    call each key; `auto` and `dry-run` follow the policy above and name keys
+    after the variable they are assigned to. A secret already in the vault,
+    or seen more than once, points at one key and is stored at most once.
+    """
+    from secapi.secure import key_names, vaulted_lookup
+
+    plan = Plan()
+    located = []
+    seen = set()
+    for finding in sorted(findings, key=lambda f: (f.path, f.line)):
+        path = finding.path
+        if path not in plan.sources:
+            try:
+                plan.sources[path] = _read_lines(path)
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"❌ Cannot fix '{path}': {e}")
+                plan.sources[path] = None
+        lines = plan.sources[path]
+        if lines is None:
+            continue
+        if not 0 < finding.line <= len(lines):
+            plan.left_out.append((finding, "the line no longer exists"))
+            continue
+        text = lines[finding.line - 1]
+        span = locate_secret(text, finding)
+        if not isinstance(span, tuple):
+            # Reported once per line, however many patterns matched it.
+            if (path, finding.line) not in seen:
+                seen.add((path, finding.line))
+                plan.left_out.append((finding, span or "the secret is not a quoted string"))
+        elif (path, finding.line, span[0]) not in seen:
+            seen.add((path, finding.line, span[0]))
+            located.append((finding, text, span))
+    plan.sources = {path: lines for path, lines in plan.sources.items() if lines is not None}
+    if not located:
+        return plan
+
+    # A dry run does not prompt for the password, so it only recognises
+    # vaulted secrets while `secapi unlock` is running.
+    vaulted = vaulted_lookup(unlock=mode != "dry-run") or (lambda secret: None)
+    taken = set(key_names())
+    names_by_secret = {}
+
+    for finding, text, (start, end, secret) in located:
+        path = finding.path
+        action = "replace" if path.endswith(REWRITE_EXTENSIONS) else "store"
+        reason = None
+        if mode != "interactive":
+            if finding.label in AUTO_SKIP_LABELS:
+                action, reason = "skip", f"{finding.label} findings need review"
+            elif not covers_literal(finding, start, end, secret):
+                action, reason = "skip", "the match is only part of the string"
+        if secret not in names_by_secret:
+            names_by_secret[secret] = vaulted(secret)
+        key_name = names_by_secret[secret]
+        in_vault = key_name is not None and key_name not in plan.entries
+
+        if mode == "interactive":
+            print(f"\n💡 Suggestion: {path}:{finding.line} looks like a hardcoded {finding.label} key.")
+            print(f"    {text.strip()}")
+            if in_vault:
+                print(f"🔁 Already vaulted as '{key_name}'.")
+            print("Options:")
+            print("  [1] Replace with secure reference")
+            print("  [2] Store in encrypted vault")
+            print("  [3] Ignore")
+            choice = input("Select an option: ").strip()
+            if choice not in {"1", "2"}:
+                print("⚠️  Skipped." if choice == "3" else "❌ Invalid choice. Skipping.")
+                action = "skip"
+            elif choice == "2":
+                action = "store"
+            if action != "skip" and key_name is None:
+                key_name = _ask("Give this key a name", unique_name(suggest_name(text, start, finding.label), taken))
+
+        if action != "skip" and key_name is None:
+            key_name = unique_name(suggest_name(text, start, finding.label), taken)
+        if action != "skip" and names_by_secret[secret] is None:
+            names_by_secret[secret] = key_name
+            plan.entries[key_name] = secret
+            taken.add(key_name)
+
+        plan.fixes.append(Fix(path, finding.line, finding.label, start, end, secret, key_name, action, in_vault, reason))
+
+    return plan
+
+
+def remediate(findings, mode="interactive"):
+    """
+    Fixes findings in one batch. `dry-run` prints the plan as a unified diff
+    and writes nothing; `auto` prints it and applies it without prompting;
+    `interactive` prompts for each finding, then applies everything at once.
+    """
+    plan = build_plan(findings, mode)
+    if mode != "interactive" and plan.fixes:
+        print(plan.diff(), end="")
+        for fix in plan.fixes:
+            if fix.action == "store" and fix.vaulted:
+                print(f"# {fix.path}:{fix.line}: already vaulted as '{fix.key_name}', edit the file by hand")
+            elif fix.action == "store":
+                print(f"# {fix.path}:{fix.line}: store as '{fix.key_name}', edit the file by hand")
+            elif fix.action == "skip":
+                print(f"# {fix.path}:{fix.line}: skipped ({fix.reason})")
+    for finding, reason in plan.left_out:
+        print(f"# {finding.path}:{finding.line}: left as is ({reason}), fix it by hand")
+    if not plan.fixes:
+        print("⚠️ Nothing to fix automatically: no quoted secrets found on the reported lines.")
+        return plan
+    print(f"\n📋 Plan: {plan.summary()}.")
+    if mode != "dry-run":
+        plan.apply()
+    return plan
@@ -0,0 +1,90 @@
+# Machine-readable output for scanner findings
+
+import json
+import os
+
+from secapi.entropy import ENTROPY_LABEL
+from secapi.scanner import PATTERNS
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+
+# Artifact URIs are relative to the scanned directory, declared under this id.
+SARIF_ROOT_ID = "SRCROOT"
+
+
+def write_jsonl(findings, out):
+    """Writes one JSON object per finding, flushing as each one arrives."""
+    count = 0
+    for finding in findings:
+        out.write(json.dumps(finding.to_dict()) + "\n")
+        out.flush()
+        count += 1
+    return count
+
+
+def _artifact_location(path, root):
+    """A relative, `/`-separated and percent-encoded URI for `path`, based on `root` if given."""
+    from urllib.parse import quote
+    if root is None:
+        return {"uri": quote(path.replace("\\", "/"))}
+    relative = os.path.relpath(os.path.abspath(path), os.path.abspath(root))
+    return {"uri": quote(relative.replace(os.sep, "/")), "uriBaseId": SARIF_ROOT_ID}
+
+
+def _sarif_result(finding, root=None):
+    result = {
+        "ruleId": finding.label,
+        "level": "error",
+        "message": {"text": f"Potential hardcoded {finding.label} secret."},
+        "locations": [{
+            "physicalLocation": {
+                "artifactLocation": _artifact_location(finding.path, root),
+                "region": {
+                    "startLine": finding.line,
+                    "startColumn": finding.column,
+                    "endColumn": finding.column + finding.span[1] - finding.span[0],
+                },
+            }
+        }],
+    }
+    occurrences = getattr(finding, "occurrences", None)
+    if occurrences is not None:
+        result["properties"] = {
+            "blob": finding.blob,
+            "commits": [{"commit": commit, "path": path} for commit, path in occurrences],
+        }
+    return result
+
+
+def write_sarif(findings, out, root=None):
+    """
+    Writes a SARIF 2.1.0 log. The document is emitted incrementally so that
+    results are never all held in memory at once. With `root`, the scanned
+    directory, paths are written relative to it; without, they are taken to
+    be relative already, as git reports them.
+    """
+    driver = {
+        "name": "secapi",
+        "rules": [
+            {"id": label, "shortDescription": {"text": f"Hardcoded {label} secret"}}
+            for label in [*PATTERNS, ENTROPY_LABEL]
+        ],
+    }
+    run = {"tool": {"driver": driver}}
+    if root is not None:
+        import pathlib
+        base = pathlib.Path(os.path.abspath(root)).as_uri().rstrip("/") + "/"
+        run["originalUriBaseIds"] = {SARIF_ROOT_ID: {"uri": base}}
+    run["results"] = []
+    header = json.dumps({"version": "2.1.0", "$schema": SARIF_SCHEMA, "runs": [run]})
+    # Split the serialised skeleton at the empty results array and stream the
+    # results in between.
+    head, tail = header.rsplit('"results": []', 1)
+    out.write(head + '"results": [')
+    count = 0
+    for finding in findings:
+        out.write(("," if count else "") + "\n" + json.dumps(_sarif_result(finding, root)))
+        count += 1
+    out.write("\n]" + tail + "\n")
+    out.flush()
+    return count
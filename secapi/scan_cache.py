@@ -0,0 +1,71 @@
+# On-disk index of scan results keyed by file fingerprint
+
+import hashlib
+import json
+import os
+
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "secapi")
+
+
+def open_private(path):
+    """
+    Opens a cache file for writing, readable only by the user: cached
+    findings quote the lines, and so the secrets, they were found on.
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    os.chmod(directory, 0o700)  # Also tightens a directory an older version created
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    return os.fdopen(fd, 'w', encoding='utf-8')
+
+
+class ScanCache:
+    """
+    Maps each scanned path to `[size, mtime_ns, sha256, findings]` for one
+    scan root. The whole index is dropped when `signature` (derived from the
+    patterns and scanner version) differs from the one it was written with.
+    """
+
+    def __init__(self, directory, signature, cache_dir=None):
+        root = os.path.abspath(directory)
+        name = hashlib.sha1(root.encode()).hexdigest()
+        self.path = os.path.join(cache_dir or CACHE_DIR, f"scan-{name}.json")
+        self.signature = signature
+        self.entries = {}
+        self.seen = set()
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("signature") == self.signature:
+            self.entries = data.get("files", {})
+
+    def get(self, path):
+        return self.entries.get(path)
+
+    def put(self, path, entry):
+        self.seen.add(path)
+        if self.entries.get(path) != entry:
+            self.entries[path] = entry
+            self.dirty = True
+
+    def save(self):
+        """Writes the index atomically, dropping paths not seen in this run."""
+        stale = set(self.entries) - self.seen
+        for path in stale:
+            del self.entries[path]
+        if not (self.dirty or stale):
+            return
+        try:
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open_private(tmp_path) as f:
+                json.dump({"signature": self.signature, "files": self.entries}, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except OSError as e:
+            print(f"⚠️ Could not write scan cache: {e}")
@@ -1,7 +1,21 @@
 # Regex-based scanner
+#
+# `check --staged` runs on every commit, so modules only some scans need
+# (hashing, JSON, the scan cache) are imported where they are used.
 
+import mmap
 import os
 import re
+import time
+from collections import deque
+from contextlib import contextmanager
+from secapi import trace
+from secapi.entropy import DEFAULT_ENTROPY, ENTROPY_LABEL
+from secapi.walker import SCAN_EXTENSIONS, walk
+
+# Bump whenever a change to the scanner alters its findings, so cached scan
+# results from older versions are discarded.
+SCANNER_VERSION = "6"
 
 # Common API key patterns
 PATTERNS = {
@@ -20,19 +34,487 @@ PATTERNS = {
     "Generic": r"(?i)(api|secret|token|key)[\s\"']*[:=][\s\"']*[0-9a-zA-Z\-\._]{16,}"
 }
 
-def scan_directory(directory):
-    findings = []
-    for root, _, files in os.walk(directory):
-        for file in files:
-            if file.endswith(('.py', '.js', '.ts', '.env', '.json', '.yml', '.yaml', '.txt')):
-                path = os.path.join(root, file)
-                try:
-                    with open(path, 'r', errors='ignore') as f:
-                        for i, line in enumerate(f, 1):
-                            for label, pattern in PATTERNS.items():
-                                match = re.search(pattern, line)
-                                if match:
-                                    findings.append((path, i, line.strip(), label))
-                except (PermissionError, IsADirectoryError, UnicodeDecodeError):
-                    pass  # Silently skip unreadable or invalid files
-    return findings
\ No newline at end of file
+
+# Literals that must occur somewhere in a match, used to skip whole patterns for
+# files that cannot contain them. Patterns compiled with `(?i)` are checked
+# against the lower-cased text, so their anchors are lower-case.
+ANCHORS = {
+    "Stripe": ("sk_live_",),
+    "Google": ("AIza",),
+    "GitHub": ("ghp_",),
+    "Slack": ("xox",),
+    "OpenAI": ("sk-",),
+    "Microsoft Graph": ("-",),
+    "AWS Access Key": ("AKIA",),
+    "AWS Secret Key": ("aws_secret_access_key",),
+    "Twilio": ("SK",),
+    "Heroku": ("heroku_",),
+    "SendGrid": ("SG.",),
+    "Dropbox": ("sl.",),
+    "Generic": ("api", "secret", "token", "key"),
+}
+
+
+def _lowered_form(pattern):
+    """
+    Returns a flag-free equivalent of a `(?i)` pattern for use on lower-cased
+    ASCII text, or None when the pattern cannot be rewritten safely.
+
+    Case-insensitive matching disables the regex engine's literal scanning,
+    which makes `(?i)` patterns several times slower over large buffers.
+    """
+    if not pattern.startswith("(?i)"):
+        return None
+    body = pattern[len("(?i)"):]
+    if re.search(r"\\[xuUN0-9]", body):
+        return None  # Escaped code points may name upper-case letters
+
+    def lower_unescaped(match):
+        token = match.group(0)
+        return token if token.startswith("\\") else token.lower()
+
+    return re.sub(r"\\.|.", lower_unescaped, body, flags=re.S)
+
+
+def compile_patterns(patterns=None, anchors=None, binary=False):
+    """
+    Compiles every pattern once into a detector table of
+    `(label, regex, prefilter, anchors, lowered)` entries.
+
+    `prefilter` is run over the whole file to locate candidate lines and
+    `regex` then confirms each candidate line, so the findings are identical to
+    running `re.search(pattern, line)` for every pattern on every line. With
+    `binary=True` the detectors match bytes instead of str.
+    """
+    patterns = PATTERNS if patterns is None else patterns
+    anchors = ANCHORS if anchors is None else anchors
+    encode = (lambda value: value.encode()) if binary else (lambda value: value)
+    detectors = []
+    for label, pattern in patterns.items():
+        regex = re.compile(encode(pattern))
+        label_anchors = tuple(encode(anchor) for anchor in anchors.get(label, ()))
+        lowered_pattern = _lowered_form(pattern)
+        if lowered_pattern is not None:
+            detectors.append((label, regex, re.compile(encode(lowered_pattern)), label_anchors, True))
+        else:
+            detectors.append((label, regex, regex, label_anchors, False))
+    return detectors
+
+
+_detectors = {}  # binary -> detector table for PATTERNS
+
+
+def default_detectors(binary=False):
+    """The detector table for PATTERNS, compiled on first use."""
+    table = _detectors.get(binary)
+    if table is None:
+        table = _detectors[binary] = compile_patterns(binary=binary)
+    return table
+
+
+def _count_newlines(buf, newline, start, end):
+    if hasattr(buf, 'count'):
+        return buf.count(newline, start, end)
+    # mmap has no count(); count in slices so memory stays flat.
+    total = 0
+    for offset in range(start, end, 1 << 20):
+        total += buf[offset:min(offset + (1 << 20), end)].count(newline)
+    return total
+
+
+def _match_detector(detector, text, lowered, newline, hits):
+    """Adds one detector's `(label, start, end)` hits to `hits`, keyed by line start."""
+    label, regex, prefilter, anchors, is_lowered = detector
+    haystack = text
+    if is_lowered:
+        if lowered is None:
+            # Fall back to the exact case-insensitive pattern, unanchored.
+            prefilter, anchors = regex, ()
+        else:
+            haystack = lowered
+    if anchors and all(haystack.find(anchor) == -1 for anchor in anchors):
+        return
+    pos = 0
+    while True:
+        match = prefilter.search(haystack, pos)
+        if not match:
+            break
+        start = text.rfind(newline, 0, match.start()) + 1
+        end = text.find(newline, match.start())
+        if end == -1:
+            end = len(text)
+        confirmed = regex.search(text, start, end)
+        if confirmed:
+            hits.setdefault(start, []).append(
+                (label, confirmed.start() - start, confirmed.end() - start)
+            )
+        pos = end + 1
+
+
+def scan_text(text, detectors=None, entropy=DEFAULT_ENTROPY):
+    """
+    Scans a whole buffer (str, bytes or mmap) and yields `(line_num, line,
+    label, start, end)` for every pattern that matches a line, in line order
+    and then pattern order. `start` and `end` are the offsets of the match
+    within `line`. Line numbers are only computed for lines that matched.
+
+    `entropy` is run as one more detector after the patterns, for lines that
+    no pattern matched; pass None to disable it.
+    """
+    is_str = isinstance(text, str)
+    if detectors is None:
+        detectors = default_detectors(binary=not is_str)
+    newline = '\n' if is_str else b'\n'
+    # Lower-casing never adds or removes newlines, and for ASCII text it keeps
+    # every offset, so candidate positions map straight back onto `text`.
+    # A mapped file is never copied just to lower-case it.
+    if is_str:
+        lowered = text.lower() if text.isascii() else None
+    else:
+        lowered = text.lower() if isinstance(text, bytes) else None
+    hits = {}
+    tracing = trace.enabled
+    for detector in detectors:
+        if tracing:
+            started = time.perf_counter()
+            _match_detector(detector, text, lowered, newline, hits)
+            trace.add(f"scan.match.{detector[0]}", time.perf_counter() - started)
+        else:
+            _match_detector(detector, text, lowered, newline, hits)
+
+    if entropy is not None:
+        if tracing:
+            started = time.perf_counter()
+        for token_start, token_end in entropy.find(text):
+            start = text.rfind(newline, 0, token_start) + 1
+            line_hits = hits.setdefault(start, [])
+            if not line_hits or line_hits[-1][0] == ENTROPY_LABEL:
+                line_hits.append((ENTROPY_LABEL, token_start - start, token_end - start))
+        if tracing:
+            trace.add("scan.entropy", time.perf_counter() - started)
+
+    line_num, counted_to = 1, 0
+    for start in sorted(hits):
+        line_num += _count_newlines(text, newline, counted_to, start)
+        counted_to = start
+        end = text.find(newline, start)
+        line = text[start:] if end == -1 else text[start:end]
+        for label, match_start, match_end in hits[start]:
+            yield line_num, line, label, match_start, match_end
+
+
+# Files larger than this are skipped, and files at least MMAP_THRESHOLD bytes
+# are memory-mapped instead of read into memory.
+MAX_FILE_SIZE = 32 << 20
+MMAP_THRESHOLD = 64 << 10
+# Like git, treat a NUL byte near the start of a file as a sign it is binary.
+BINARY_SNIFF_BYTES = 8000
+
+
+def looks_binary(buf):
+    return buf.find(b'\0', 0, BINARY_SNIFF_BYTES) != -1
+
+
+_LONE_CR = re.compile(rb"\r(?!\n)")
+
+
+def split_lone_cr(buf):
+    """
+    Returns `buf` with every bare CR (old Mac line ending) turned into a
+    newline, so lines are numbered as text-mode reading numbered them.
+    Buffers without one, the usual case, are returned as they are.
+    """
+    if buf is None or buf.find(b"\r") == -1 or not _LONE_CR.search(buf):
+        return buf
+    return _LONE_CR.sub(b"\n", buf)
+
+
+@contextmanager
+def open_buffer(path, size=None):
+    """
+    Yields the contents of `path` as bytes or a read-only mmap, or None when
+    the file is empty, larger than MAX_FILE_SIZE, or looks binary. Bare CRs
+    are read as line breaks.
+    """
+    started = time.perf_counter() if trace.enabled else None
+    with open(path, 'rb') as f:
+        if size is None:
+            size = os.fstat(f.fileno()).st_size
+        if size == 0 or size > MAX_FILE_SIZE:
+            buf = None
+        elif size < MMAP_THRESHOLD:
+            buf = f.read()
+        else:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            binary = buf is not None and looks_binary(buf)
+            if started is not None:
+                trace.add("scan.read", time.perf_counter() - started, size if buf is not None else 0)
+            yield None if binary else split_lone_cr(buf)
+        finally:
+            if isinstance(buf, mmap.mmap):
+                buf.close()
+
+
+class Finding:
+    """
+    A single scanner match. `column` is 1-based within the original line and
+    `span` is the `(start, end)` of the match within the stripped `content`.
+
+    Iterating a Finding yields `(path, line, content, label)`, so it unpacks
+    like the tuples `scan_directory` used to return.
+    """
+
+    __slots__ = ("path", "line", "column", "span", "content", "label")
+
+    def __init__(self, path, line, content, label, column=1, span=(0, 0)):
+        self.path = path
+        self.line = line
+        self.content = content
+        self.label = label
+        self.column = column
+        self.span = tuple(span)
+
+    def __iter__(self):
+        return iter((self.path, self.line, self.content, self.label))
+
+    def __eq__(self, other):
+        if not isinstance(other, Finding):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __hash__(self):
+        return hash((self.path, self.line, self.label, self.span))
+
+    def __repr__(self):
+        return f"Finding({self.path!r}, line={self.line}, column={self.column}, label={self.label!r})"
+
+    @property
+    def match(self):
+        """The matched text."""
+        return self.content[self.span[0]:self.span[1]]
+
+    def to_dict(self):
+        return {
+            "path": self.path,
+            "line": self.line,
+            "column": self.column,
+            "span": list(self.span),
+            "content": self.content,
+            "label": self.label,
+        }
+
+
+def scan_buffer(buf, entropy=DEFAULT_ENTROPY):
+    """
+    Scans file contents and returns `[line_num, content, label, column,
+    start, end]` records, the form stored in the scan cache.
+    """
+    if buf is None:
+        return []
+    records = []
+    for i, line, label, match_start, match_end in scan_text(buf, entropy=entropy):
+        if not isinstance(line, str):
+            prefix = line[:match_start].decode('utf-8', errors='ignore')
+            matched = line[match_start:match_end].decode('utf-8', errors='ignore')
+            line = line.decode('utf-8', errors='ignore')
+        else:
+            prefix, matched = line[:match_start], line[match_start:match_end]
+        content = line.strip()
+        leading = len(line) - len(line.lstrip())
+        start = len(prefix) - leading
+        records.append([i, content, label, len(prefix) + 1, start, start + len(matched)])
+    return records
+
+
+def _to_findings(path, records):
+    return [
+        Finding(path, line, content, label, column, (start, end))
+        for line, content, label, column, start, end in records
+    ]
+
+
+def scan_signature(entropy=DEFAULT_ENTROPY):
+    """Identifies everything that affects findings, for the scan cache."""
+    import hashlib
+    import json
+    settings = [SCANNER_VERSION, PATTERNS, ANCHORS, entropy.signature() if entropy else None]
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()
+
+
+# Files modified this recently may change again within the filesystem's
+# timestamp granularity, so their mtime is not trusted on the next run.
+RACY_WINDOW_NS = 2 * 10**9
+
+
+def scan_file(path, entropy=DEFAULT_ENTROPY):
+    """Scans a single file and returns its findings."""
+    try:
+        with open_buffer(path) as buf:
+            return _to_findings(path, scan_buffer(buf, entropy))
+    except (OSError, ValueError):
+        return []  # Silently skip unreadable or invalid files
+
+
+def scan_file_cached(path, entry=None, entropy=DEFAULT_ENTROPY):
+    """
+    Returns the cache entry `[size, mtime_ns, sha256, findings]` for `path`.
+
+    When `entry` still matches the file's size and mtime the file is not read
+    at all; when only the content hash matches, its findings are reused
+    without rescanning. Returns None for unreadable files.
+    """
+    import hashlib
+    try:
+        st = os.stat(path)
+        if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            return entry
+        with open_buffer(path, st.st_size) as buf:
+            digest = hashlib.sha256(buf if buf is not None else b'').hexdigest()
+            if entry and entry[2] == digest:
+                findings = entry[3]
+            else:
+                findings = scan_buffer(buf, entropy)
+    except (OSError, ValueError):
+        return None
+
+    mtime_ns = st.st_mtime_ns
+    if time.time_ns() - mtime_ns < RACY_WINDOW_NS:
+        mtime_ns = -1
+    return [st.st_size, mtime_ns, digest, findings]
+
+
+# Files are sent to worker processes in batches of roughly this many bytes (or
+# at most BATCH_FILES files), so trees of tiny files do not pay one round trip
+# to the pool per file.
+BATCH_BYTES = 1 << 20
+BATCH_FILES = 256
+
+
+def _iter_batches(items):
+    batch, batch_bytes = [], 0
+    for item in items:
+        path, entry = item[0], item[1]
+        if entry:
+            size = entry[0]
+        else:
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                size = 0
+        batch.append(item)
+        batch_bytes += size
+        if batch_bytes >= BATCH_BYTES or len(batch) >= BATCH_FILES:
+            yield batch
+            batch, batch_bytes = [], 0
+    if batch:
+        yield batch
+
+
+def _scan_one(path, entry, use_cache, entropy):
+    """Returns `(path, new_cache_entry, findings)` for one file."""
+    if trace.enabled:
+        started = time.perf_counter()
+        result = _scan_one_untraced(path, entry, use_cache, entropy)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        trace.file_done(path, time.perf_counter() - started, size)
+        return result
+    return _scan_one_untraced(path, entry, use_cache, entropy)
+
+
+def _scan_one_untraced(path, entry, use_cache, entropy):
+    if not use_cache:
+        return path, None, scan_file(path, entropy)
+    entry = scan_file_cached(path, entry, entropy)
+    return path, entry, _to_findings(path, entry[3]) if entry else []
+
+
+def _scan_batch(batch):
+    return [_scan_one(*item) for item in batch]
+
+
+def _scan_batch_traced(batch):
+    """`_scan_batch` in a worker process, returning the worker's trace with the results."""
+    trace.enable()
+    trace.reset()
+    results = _scan_batch(batch)
+    return results, trace.snapshot()
+
+
+def _parallel_map(fn, items, jobs):
+    """
+    Like `executor.map`, but keeps only a bounded number of tasks in flight so
+    the input iterator is consumed lazily. Results come back in input order.
+    """
+    from concurrent.futures import ProcessPoolExecutor  # Only needed for jobs > 1
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= jobs * 4:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _merged(traced_batch):
+    results, stats = traced_batch
+    trace.merge(stats)
+    return results
+
+
+def iter_findings(directory, jobs=1, cache=False, entropy=DEFAULT_ENTROPY):
+    """
+    Scans every supported file under `directory` and yields a `Finding` as
+    soon as each file has been scanned. With `jobs` > 1 the files are scanned
+    by a pool of worker processes; `jobs=0` uses one worker per CPU. Findings
+    are always ordered by path and then line number.
+
+    With `cache=True` results are kept in an on-disk index, and files whose
+    fingerprint is unchanged since the last run are not read again. The index
+    is only written once the walk has been consumed completely.
+
+    `entropy` is the `EntropyDetector` run alongside the patterns, or None.
+    """
+    from secapi.scan_cache import ScanCache
+
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    index = ScanCache(directory, scan_signature(entropy)) if cache else None
+    paths = walk(directory, SCAN_EXTENSIONS)
+    if trace.enabled:
+        paths = trace.traced_iter("scan.walk", paths)
+    items = (
+        (path, index.get(path) if index else None, index is not None, entropy)
+        for path in paths
+    )
+    if jobs == 1:
+        results = (_scan_one(*item) for item in items)
+    elif trace.enabled:
+        results = (
+            result
+            for batch in _parallel_map(_scan_batch_traced, _iter_batches(items), jobs)
+            for result in _merged(batch)
+        )
+    else:
+        results = (
+            result
+            for batch in _parallel_map(_scan_batch, _iter_batches(items), jobs)
+            for result in batch
+        )
+
+    for path, entry, file_findings in results:
+        if index is not None and entry is not None:
+            index.put(path, entry)
+        yield from file_findings
+    if index is not None:
+        index.save()
+
+
+def scan_directory(directory, jobs=1, cache=False, entropy=DEFAULT_ENTROPY):
+    """Scans `directory` and returns the list of findings; see `iter_findings`."""
+    return list(iter_findings(directory, jobs=jobs, cache=cache, entropy=entropy))
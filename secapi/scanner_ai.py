@@ -1,78 +1,149 @@
 import os
 import re
-import json
-from getpass import getpass
-from openai import OpenAI
-from cryptography.fernet import Fernet
-from secapi.secure import load_key, get_fernet, VAULT_PATH
+from secapi import trace
+from secapi.ai_cache import AICache, cache_key
+from secapi.ai_engine import MAX_CONCURRENCY, SYSTEM_PROMPT, complete_all
+from secapi.chunker import BATCH_TOKENS, chunk_text, estimate_tokens, pack
+from secapi.secure import store_secrets, vaulted_lookup
+from secapi.walker import AI_SCAN_EXTENSIONS, walk
+
+
+_FILE_HEADER = re.compile(r"📄\s*(\d+)")
+_FINDING = re.compile(r"🧪\s*(\d+):\s*(.+)")
+
+
+def build_messages(batch):
+    sections = [
+        f"📄 {k}: {chunk.path} ({chunk.location})\n{chunk.render()}"
+        for k, chunk in enumerate(batch, 1)
+    ]
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": "\n\n".join(sections)},
+    ]
+
+
+def ai_scan_files(paths, concurrency=MAX_CONCURRENCY, client=None, prefilter=True, cache=True,
+                  batch_tokens=BATCH_TOKENS):
+    """
+    Scan files for hardcoded secrets using AI. Each file is split into
+    overlapping chunks that fit the model's budget, and only chunks with a
+    regex, entropy or string-literal candidate are sent. Chunks answered in
+    an earlier run are served from the AI cache; the rest are packed into
+    requests of up to `batch_tokens` and go out concurrently through one
+    shared client. The interactive fix prompts start only once every
+    response is in.
+    """
+    chunks, total = [], 0
+    for file_path in paths:
+        try:
+            with trace.span("ai.read") as span:
+                with open(file_path, 'r', errors='ignore') as f:
+                    text = f.read()
+                span.bytes = len(text)
+        except OSError as e:
+            print(f"❌ AI scan failed: {e}")
+            continue
+        with trace.span("ai.chunk", len(text)):
+            file_chunks, file_total = chunk_text(file_path, text, prefilter=prefilter)
+        chunks.extend(file_chunks)
+        total += file_total
+
+    ai_cache = AICache() if cache else None
+    results, keys, pending = {}, {}, []
+    for chunk in chunks:
+        keys[chunk] = cache_key(chunk.render())
+        cached = ai_cache.get(keys[chunk]) if ai_cache else None
+        if cached is None:
+            pending.append(chunk)
+        else:
+            results[chunk] = cached
+
+    batches = list(pack(pending, batch_tokens))
+    tokens = sum(estimate_tokens(chunk.render()) for chunk in pending)
+    print(f"📦 Sending {len(pending)} of {total} chunks to the AI auditor "
+          f"in {len(batches)} requests (~{tokens} tokens).")
+    replies = complete_all([build_messages(batch) for batch in batches], concurrency, client)
+    for batch, reply in zip(batches, replies):
+        if isinstance(reply, Exception):
+            for chunk in batch:
+                print(f"❌ AI scan failed for {chunk.path} ({chunk.location}): {reply}")
+            continue
+        for chunk, findings in zip(batch, split_ai_output(reply, len(batch))):
+            results[chunk] = findings
+            if ai_cache:
+                ai_cache.put(keys[chunk], findings)
+
+    if ai_cache:
+        ai_cache.evict()
+        print(f"💾 AI cache: {ai_cache.hits} hits, {ai_cache.misses} misses.")
+
+    # Overlapping chunks can report the same line twice; keep the first.
+    reported = {}
+    for chunk in chunks:
+        for chunk_line, code_line in results.get(chunk, ()):
+            line_num = chunk.to_file_line(chunk_line)
+            if line_num is not None:
+                reported.setdefault(chunk.path, {}).setdefault(line_num, code_line)
+
+    for file_path in paths:
+        if file_path in reported:
+            print("\n🔍 AI Security Audit:")
+            print(f"📄 File: {file_path}\n")
+            handle_findings(file_path, sorted(reported[file_path].items()))
+    if not reported:
+        print("✅ The AI auditor found no hardcoded secrets.")
 
 
 def ai_scan_file(file_path):
     """Scan a single file for hardcoded secrets using AI."""
-    token = load_key("gt_token")
-    endpoint = "https://models.github.ai/inference"
-    model = "openai/gpt-4.1"
-
-    client = OpenAI(
-        base_url=endpoint,
-        api_key=token,
-    )
+    ai_scan_files([file_path])
+
+
+def split_ai_output(output, sections):
+    """
+    Groups the `🧪 <line_number>: ...` lines of a reply under the `📄 <k>`
+    header they follow and returns one `(line_num, code_line)` list per
+    section. Findings before any header belong to a lone section.
+    """
+    findings = [[] for _ in range(sections)]
+    current = 0 if sections == 1 else None
+    for line in output.split("\n"):
+        line = line.strip()
+        header = _FILE_HEADER.match(line)
+        if header:
+            k = int(header.group(1)) - 1
+            current = k if 0 <= k < sections else None
+            continue
+        match = _FINDING.match(line)
+        if match and current is not None:
+            findings[current].append((int(match.group(1)), match.group(2)))
+    return findings
+
+
+def parse_ai_output(output):
+    """Returns `(line_num, code_line)` for every finding in a single-file reply."""
+    return split_ai_output(output, 1)[0]
 
-    try:
-        with open(file_path, 'r', errors='ignore') as f:
-            content = f.read()[:4000]  # Trim to fit token limit
-
-        response = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": """
-                    You are a source code security auditor. 
-
-                    Your job is to scan the code for hardcoded secrets or insecure API key usage. 
-                    ❌ Do NOT return lines that already use secure retrieval methods like `load_key(...)` or environment variables like `os.environ[...]`. 
-
-                    ✅ Only return lines that directly assign hardcoded secrets.
-
-                    Output format (strict):
-                    🧪 <line_number>: <variable_name> = <secret_string>
-
-                    Only return one line per issue. No explanations.
-                    """
-                },
-                {
-                    "role": "user",
-                    "content": f"Filename: {file_path}\n\n{content}"
-                }
-            ],
-            model=model,
-            temperature=0.2,
-            top_p=1.0
-        )
-
-        print("\n🔍 AI Security Audit:")
-        print(f"📄 File: {file_path}\n")
-
-        output = response.choices[0].message.content
-        process_ai_output(output, file_path)
 
-    except Exception as e:
-        print(f"❌ AI scan failed: {e}")
+def process_ai_output(output, file_path):
+    """
+    Process the AI output and handle user choices. `file_path` is a single
+    path, or the list of paths in a batched request in header order.
+    """
+    file_paths = [file_path] if isinstance(file_path, str) else list(file_path)
+    for path, findings in zip(file_paths, split_ai_output(output, len(file_paths))):
+        handle_findings(path, findings)
 
 
-def process_ai_output(output, file_path):
-    """Process the AI output and handle user choices."""
-    lines = output.split("\n")
-    for line in lines:
-        if "🧪" in line and re.match(r"\s*🧪\s*\d+:", line):
-            try:
-                match = re.match(r"\s*🧪\s*(\d+):\s*(.+)", line.strip())
-                line_num = int(match.group(1))
-                code_line = match.group(2)
-                print(f"    🧪 {line_num}: {code_line}")
-                handle_user_choice(file_path, line_num, code_line)
-            except Exception as e:
-                print(f"❌ Error processing line: {line}. Error: {e}")
+def handle_findings(file_path, findings):
+    """Walk the user through each `(line_num, code_line)` finding in a file."""
+    for line_num, code_line in findings:
+        try:
+            print(f"    🧪 {line_num}: {code_line}")
+            handle_user_choice(file_path, line_num, code_line)
+        except Exception as e:
+            print(f"❌ Error processing line {line_num}: {code_line}. Error: {e}")
 
 
 def handle_user_choice(file_path, line_num, code_line):
@@ -94,13 +165,18 @@ def handle_user_choice(file_path, line_num, code_line):
 
 
 def replace_with_load_key(file_path, line_num, code_line):
-    """Replace hardcoded secrets with `load_key()` and store them securely."""
+    """
+    Replace hardcoded secrets with `load_key()` and store them securely. A
+    secret that is already in the vault is pointed at its existing key.
+    """
     try:
-        key_name = input("Give this key a name (e.g., 'openai_key'): ").strip()
         secret = code_line.split("=")[1].strip().strip('"')
-
-        fernet = get_fernet()
-        encrypted = fernet.encrypt(secret.encode()).decode()
+        key_name = vaulted_lookup(unlock=True)(secret)
+        vaulted = key_name is not None
+        if vaulted:
+            print(f"🔁 Already vaulted as '{key_name}'.")
+        else:
+            key_name = input("Give this key a name (e.g., 'openai_key'): ").strip()
 
         with open(file_path, 'r') as f:
             all_lines = f.readlines()
@@ -117,41 +193,24 @@ def replace_with_load_key(file_path, line_num, code_line):
         with open(file_path, 'w') as f:
             f.writelines(all_lines)
 
-        # Update the vault
-        update_vault(key_name, encrypted)
-        print(f"✅ Replaced and stored key '{key_name}' securely.\n")
-
-    except Exception as e:
-        print(f"❌ Failed to replace secret: {e}")
-
-
-def update_vault(key_name, encrypted):
-    """Update the vault with the new encrypted secret."""
-    try:
-        if os.path.exists(VAULT_PATH):
-            with open(VAULT_PATH, 'r') as v:
-                vault = json.load(v)
+        if vaulted:
+            print(f"✅ Replaced with existing key '{key_name}'.\n")
         else:
-            vault = {}
+            store_secrets({key_name: secret})
+            print(f"✅ Replaced and stored key '{key_name}' securely.\n")
 
-        vault[key_name] = encrypted
-        with open(VAULT_PATH, 'w') as v:
-            json.dump(vault, v, indent=2)
     except Exception as e:
-        print(f"❌ Failed to update vault: {e}")
+        print(f"❌ Failed to replace secret: {e}")
 
 
-def ai_scan_path(path):
+def ai_scan_path(path, concurrency=MAX_CONCURRENCY, prefilter=True, cache=True, batch_tokens=BATCH_TOKENS):
     """Scan a file or directory for hardcoded secrets."""
     if os.path.isfile(path):
-        ai_scan_file(path)
+        ai_scan_files([path], concurrency, prefilter=prefilter, cache=cache, batch_tokens=batch_tokens)
     elif os.path.isdir(path):
         print(f"\n📁 Scanning folder: {path}\n")
-        for root, _, files in os.walk(path):
-            for file in files:
-                if file.endswith(('.py', '.js', '.ts', '.env', '.json', '.yml')):
-                    full_path = os.path.join(root, file)
-                    print(f"🔍 Scanning file: {full_path}")
-                    ai_scan_file(full_path)
+        paths = list(walk(path, AI_SCAN_EXTENSIONS))
+        print(f"🔍 Scanning {len(paths)} files, up to {concurrency} at a time...")
+        ai_scan_files(paths, concurrency, prefilter=prefilter, cache=cache, batch_tokens=batch_tokens)
     else:
         print(f"❌ Invalid path: {path}")
@@ -1,39 +1,229 @@
 # secapi/secure.py (Password-required key deletion)
 
-import json
 import os
 import base64
+import hashlib
+import hmac
 from getpass import getpass
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, InvalidToken
+from secapi import trace
+from secapi.unlock_agent import fetch_fingerprint_key, fetch_keys
+from secapi.vault_store import open_store
 
 VAULT_PATH = os.path.expanduser("~/.secapi_vault.json")
 
 _fernet_instance = None  # Global cached Fernet
+_data_key = None  # Key that encrypts the entries, unwrapped with the password
+
+# scrypt cost for newly wrapped data keys. Each vault stores the parameters it
+# was wrapped with, so raising these only affects later password changes.
+SCRYPT_N = 2 ** 15
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+# Context for deriving the fingerprint key from the data key, so a fingerprint
+# reveals nothing about the key that encrypts the entries.
+FINGERPRINT_CONTEXT = b"secapi fingerprint v1"
+
+# Decrypted values by ciphertext. A rewritten entry gets a new ciphertext, so
+# the memo never serves a stale value.
+_decrypted = {}
+
+# (keys, fp, {fingerprint: key name}) for the last vault read; rebuilt when
+# the store hands out new dicts.
+_fingerprint_index = None
 
 def safe_input(prompt_text):
     return getpass(f"{prompt_text}: ")
 
+def _store():
+    return open_store(VAULT_PATH)
+
+
+def _cached_vault():
+    """
+    Returns the encrypted keys, re-reading the vault only when it changes.
+    The dict is shared; callers must not modify it.
+    """
+    return _store().get("keys")
+
+
+def invalidate_vault_cache():
+    """Forgets the parsed vault so the next read goes to disk."""
+    _store().invalidate()
+
+
+def store_secrets(secrets):
+    """
+    Encrypts plaintext keys (`{name: value}`) and stores them with their
+    fingerprints in a single locked append. Overwriting a key rewrites the
+    vault instead, so the old value's ciphertext does not linger in the log.
+    """
+    fernet = get_fernet()
+    encrypted = {name: fernet.encrypt(value.encode()).decode() for name, value in secrets.items()}
+    records = [("keys", name, token) for name, token in encrypted.items()]
+    fp_key = fingerprint_key()
+    if fp_key is not None:
+        records += _fingerprint_records(fp_key, secrets, encrypted)
+    vault = _cached_vault()
+    _store().write(records, purge=any(name in vault for name in secrets))
+
+
+def key_names():
+    """Names of every key in the vault, without decrypting anything."""
+    return list(_cached_vault()) if os.path.exists(VAULT_PATH) else []
+
+
+def _decrypt(fernet, encrypted):
+    value = _decrypted.get(encrypted)
+    if value is None:
+        with trace.span("vault.decrypt", len(encrypted)):
+            value = _decrypted[encrypted] = fernet.decrypt(encrypted.encode()).decode()
+    return value
+
+
+def fingerprint(fp_key, secret):
+    """Keyed hash of a plaintext secret: equal secrets match, and nothing else can be learned from it."""
+    return hmac.new(fp_key, secret.encode(), hashlib.sha256).hexdigest()
+
+
+def _token_digest(token):
+    return hashlib.sha256(token.encode()).hexdigest()[:16]
+
+
+def _fingerprint_records(fp_key, secrets, encrypted):
+    """
+    `fp` records for `{name: value}` encrypted as `{name: token}`. Each holds
+    the digest of the token it was made for, so an entry rewritten without
+    one (say by an older secapi) is simply left out of the index.
+    """
+    return [("fp", name, [fingerprint(fp_key, value), _token_digest(encrypted[name])])
+            for name, value in secrets.items()]
+
+
+def fingerprint_key():
+    """
+    The HMAC key for fingerprints, from this process's unlocked vault or
+    from `secapi unlock`'s agent. None while the vault is locked.
+    """
+    if _data_key is not None:
+        return hmac.new(_data_key, FINGERPRINT_CONTEXT, hashlib.sha256).digest()
+    if os.path.exists(VAULT_PATH):
+        return fetch_fingerprint_key(VAULT_PATH)
+    return None
+
+
+def vaulted_lookup(unlock=False):
+    """
+    Returns a function mapping a plaintext secret to the name of the vault
+    key that holds it, or None; each lookup is one HMAC and one dict probe.
+    Keys stored before fingerprints existed are indexed here, with one
+    decryption pass and one append. Returns None while the vault is locked,
+    unless `unlock` is set.
+    """
+    global _fingerprint_index
+    if not os.path.exists(VAULT_PATH):
+        return lambda secret: None
+    if unlock:
+        get_fernet()
+    fp_key = fingerprint_key()
+    if fp_key is None:
+        return None
+
+    store = _store()
+    keys, fp = store.get("keys"), store.get("fp")
+    if _fingerprint_index is None or _fingerprint_index[0] is not keys or _fingerprint_index[1] is not fp:
+        unindexed = [name for name, token in keys.items()
+                     if name not in fp or fp[name][1] != _token_digest(token)]
+        if unindexed:
+            secrets = dict(zip(unindexed, load_keys(unindexed)))
+            store.write(_fingerprint_records(fp_key, secrets, {name: keys[name] for name in unindexed}))
+            keys, fp = store.get("keys"), store.get("fp")
+        index = {fp[name][0]: name for name, token in keys.items()
+                 if name in fp and fp[name][1] == _token_digest(token)}
+        _fingerprint_index = (keys, fp, index)
+
+    index = _fingerprint_index[2]
+    return lambda secret: index.get(fingerprint(fp_key, secret))
+
+
+def _new_kdf():
+    salt = base64.b64encode(os.urandom(16)).decode()
+    return {"name": "scrypt", "n": SCRYPT_N, "r": SCRYPT_R, "p": SCRYPT_P, "salt": salt}
+
+
+def _derive_kek(password, kdf):
+    """The key-encryption key for `password` under a vault's stored scrypt parameters."""
+    with trace.span("vault.kdf"):
+        key = hashlib.scrypt(
+            password.encode(), salt=base64.b64decode(kdf["salt"]),
+            n=kdf["n"], r=kdf["r"], p=kdf["p"], maxmem=256 * kdf["r"] * (kdf["n"] + kdf["p"]), dklen=32,
+        )
+    return Fernet(base64.urlsafe_b64encode(key))
+
+
+def _wrap(password, data_key):
+    """Returns the `meta` entries that unlock `data_key` with `password`, under a fresh salt."""
+    kdf = _new_kdf()
+    return {"kdf": kdf, "data_key": _derive_kek(password, kdf).encrypt(data_key).decode()}
+
+
+def _legacy_fernet(password):
+    return Fernet(base64.urlsafe_b64encode(password.ljust(32, '0').encode()[:32]))
+
+
+def _unlock(password):
+    """
+    Returns the vault's data key. A vault without one is created, or, if it
+    still holds keys encrypted directly with the padded password, migrated
+    in one pass: every entry is re-encrypted under a new data key and the
+    vault is rewritten atomically.
+    """
+    store = _store()
+    meta = store.get("meta")
+    if "data_key" in meta:
+        data_key = _derive_kek(password, meta["kdf"]).decrypt(meta["data_key"].encode())
+        _discard_backup(store)
+        return data_key
+
+    with store.lock():
+        meta = store.get("meta")
+        if "data_key" in meta:
+            return _derive_kek(password, meta["kdf"]).decrypt(meta["data_key"].encode())
+        data_key = Fernet.generate_key()
+        legacy_keys = store.get("keys")
+        if not legacy_keys:
+            store.write([("meta", name, value) for name, value in _wrap(password, data_key).items()])
+            return data_key
+
+        legacy, fernet = _legacy_fernet(password), Fernet(data_key)
+        keys = {name: fernet.encrypt(legacy.decrypt(value.encode())).decode() for name, value in legacy_keys.items()}
+        store.replace({"keys": keys, "meta": _wrap(password, data_key)})
+        print("🔄 Upgraded the vault to scrypt-protected envelope encryption.")
+        if store.get("keys") == keys:
+            _discard_backup(store)
+        return data_key
+
+
+def _discard_backup(store):
+    if store.discard_backup():
+        print(f"🧹 Removed {store.path}.bak, which held your keys under the old password-only encryption.")
+
+
 def get_fernet():
-    global _fernet_instance
+    global _fernet_instance, _data_key
     if _fernet_instance is not None:
         return _fernet_instance
 
     password = safe_input("🔐 Enter your master vault password")
-    key = base64.urlsafe_b64encode(password.ljust(32, '0').encode()[:32])
-    f = Fernet(key)
+    try:
+        data_key = _unlock(password)
+    except InvalidToken:
+        print("❌ Invalid password for the current vault.")
+        exit(1)
 
-    if os.path.exists(VAULT_PATH):
-        try:
-            with open(VAULT_PATH, 'r') as v:
-                vault = json.load(v)
-            if vault:
-                test_value = next(iter(vault.values()))
-                f.decrypt(test_value.encode())  # Validate password
-        except Exception:
-            print("❌ Invalid password for the current vault.")
-            exit(1)
-
-    _fernet_instance = f
+    _data_key = data_key
+    _fernet_instance = Fernet(data_key)
     return _fernet_instance
 
 def change_vault_password():
@@ -42,11 +232,7 @@ def change_vault_password():
         return
 
     try:
-        old_fernet = get_fernet()
-        with open(VAULT_PATH, 'r') as f:
-            vault = json.load(f)
-
-        decrypted = {k: old_fernet.decrypt(v.encode()).decode() for k, v in vault.items()}
+        get_fernet()  # Verifies the current password
 
         new_pass = getpass("🔐 Enter your new master password: ")
         confirm = getpass("🔁 Confirm new password: ")
@@ -54,13 +240,12 @@ def change_vault_password():
             print("❌ Passwords do not match.")
             return
 
-        new_key = base64.urlsafe_b64encode(new_pass.ljust(32, '0').encode()[:32])
-        new_fernet = Fernet(new_key)
-
-        new_vault = {k: new_fernet.encrypt(v.encode()).decode() for k, v in decrypted.items()}
-
-        with open(VAULT_PATH, 'w') as f:
-            json.dump(new_vault, f, indent=2)
+        # Only the data key is re-wrapped; the entries stay as they are. The
+        # vault is rewritten rather than appended to, so no copy of the data
+        # key wrapped with the old password is left in the log.
+        store = _store()
+        with store.lock():
+            store.replace({"meta": {**store.get("meta"), **_wrap(new_pass, _data_key)}})
 
         print("✅ Vault password updated successfully.")
 
@@ -76,48 +261,51 @@ def add_key_interactively():
         print("❌ Key name and value cannot be empty.")
         return
 
-    fernet = get_fernet()
-    encrypted = fernet.encrypt(key_value.encode()).decode()
-
-    if os.path.exists(VAULT_PATH):
-        with open(VAULT_PATH, 'r') as v:
-            vault = json.load(v)
-    else:
-        vault = {}
-
-    if key_name in vault:
+    if os.path.exists(VAULT_PATH) and key_name in _cached_vault():
         print(f"⚠️ Key '{key_name}' already exists. Overwriting...")
 
-    vault[key_name] = encrypted
-    with open(VAULT_PATH, 'w') as v:
-        json.dump(vault, v, indent=2)
+    store_secrets({key_name: key_value})
 
     print(f"✅ Key '{key_name}' securely stored in your vault.")
     print("\n🔁 Use it in your code like this:")
     print(f"    {key_name} = load_key(\"{key_name}\")\n")
 
 def load_key(key_name):
+    return load_keys([key_name])[0]
+
+def load_keys(key_names):
+    """
+    Loads several keys with one vault read and returns their values in order.
+    While `secapi unlock` is running, the agent serves them without a prompt.
+    """
     if not os.path.exists(VAULT_PATH):
         raise FileNotFoundError("Vault not found. Please run the CLI fixer first.")
-
-    with open(VAULT_PATH, 'r') as v:
-        vault = json.load(v)
-
-    if key_name not in vault:
-        raise KeyError(f"Key '{key_name}' not found in the vault.")
+    if not key_names:
+        return []
+
+    if _fernet_instance is None:
+        with trace.span("vault.agent"):
+            values = fetch_keys(VAULT_PATH, key_names)
+        if values is not None:
+            return values
+
+    vault = _cached_vault()
+    missing = [name for name in key_names if name not in vault]
+    if len(missing) == 1:
+        raise KeyError(f"Key '{missing[0]}' not found in the vault.")
+    if missing:
+        raise KeyError(f"Keys {', '.join(repr(name) for name in missing)} not found in the vault.")
 
     fernet = get_fernet()
-    encrypted = vault[key_name]
-    decrypted = fernet.decrypt(encrypted.encode()).decode()
-    return decrypted
+    vault = _cached_vault()  # Unlocking may have upgraded the vault
+    return [_decrypt(fernet, vault[name]) for name in key_names]
 
 def list_keys():
     if not os.path.exists(VAULT_PATH):
         print("🔒 No keys stored yet.")
         return
 
-    with open(VAULT_PATH, 'r') as f:
-        vault = json.load(f)
+    vault = _cached_vault()
 
     if not vault:
         print("🔒 No keys stored yet.")
@@ -134,13 +322,8 @@ def delete_key(key_name):
 
     fernet = get_fernet()  # 🔐 Require password before deletion
 
-    with open(VAULT_PATH, 'r') as f:
-        vault = json.load(f)
-
-    if key_name in vault:
-        del vault[key_name]
-        with open(VAULT_PATH, 'w') as f:
-            json.dump(vault, f, indent=2)
+    if key_name in _cached_vault():
+        _store().write([("keys", key_name, None), ("fp", key_name, None)], purge=True)
         print(f"🗑️ Key '{key_name}' deleted successfully.")
     else:
         print(f"❌ Key '{key_name}' not found in the vault.")
@@ -150,17 +333,10 @@ def rotate_key(key_name):
         print("❌ Vault not found.")
         return
 
-    with open(VAULT_PATH, 'r') as f:
-        vault = json.load(f)
-
-    if key_name not in vault:
+    if key_name not in _cached_vault():
         print(f"❌ Key '{key_name}' not found in the vault.")
         return
 
     new_value = safe_input(f"🔁 Enter new value for key '{key_name}'").strip()
-    fernet = get_fernet()
-    encrypted = fernet.encrypt(new_value.encode()).decode()
-    vault[key_name] = encrypted
-    with open(VAULT_PATH, 'w') as f:
-        json.dump(vault, f, indent=2)
+    store_secrets({key_name: new_value})
     print(f"🔁 Key '{key_name}' rotated successfully.")
@@ -0,0 +1,84 @@
+# Scanner for lines added in the git index, for pre-commit hooks
+
+import re
+import subprocess
+
+from secapi.entropy import DEFAULT_ENTROPY
+from secapi.scanner import Finding, scan_buffer
+from secapi.walker import SCAN_EXTENSIONS
+
+_HUNK = re.compile(rb"^@@ -\d+(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+def _git(repo, *args):
+    return subprocess.run(["git", "-C", repo, *args], capture_output=True, check=True).stdout
+
+
+def _staged_diff(repo):
+    """The zero-context staged diff, and the path of each file in it in the same order."""
+    options = ["-c", "core.quotePath=false", "diff", "--cached", "--no-color", "--no-ext-diff", "--diff-filter=ACMR"]
+    diff = _git(repo, *options, "--unified=0", "--src-prefix=a/", "--dst-prefix=b/")
+    names = _git(repo, *options, "--name-only", "-z")
+    return diff, [name.decode("utf-8", errors="replace") for name in names.split(b"\0") if name]
+
+
+def _header_path(line):
+    """The path in a `+++ b/...` header, or None for `/dev/null` and C-quoted names."""
+    target = line[4:].rstrip(b"\t").decode("utf-8", errors="replace")
+    return target[2:] if target.startswith("b/") else None
+
+
+def added_lines(diff, paths=None):
+    """
+    Parses a zero-context diff into `{path: [(line_num, line), ...]}` of added
+    lines. Each hunk's body is consumed by the line counts in its `@@` header,
+    so added content that looks like a header is still content. `paths` names
+    the files in diff order, as `git diff --name-only -z` lists them; without
+    it names come from the `+++` headers, which git quotes when unusual.
+    """
+    files, path, section = {}, None, -1
+    in_header = False
+    old_left = new_left = line_num = 0
+    for line in diff.split(b"\n"):
+        if old_left or new_left:
+            if line.startswith(b"+") and new_left:
+                if path is not None:
+                    files[path].append((line_num, line[1:]))
+                line_num += 1
+                new_left -= 1
+            elif line.startswith(b"-") and old_left:
+                old_left -= 1
+            continue  # "\ No newline at end of file"
+        if line.startswith(b"diff --git "):
+            section += 1
+            path = paths[section] if paths is not None and section < len(paths) else None
+            if path is not None:
+                files.setdefault(path, [])
+            in_header = True
+        elif in_header and line.startswith(b"+++ ") and paths is None:
+            path = _header_path(line)
+            if path is not None:
+                files.setdefault(path, [])
+        elif line.startswith(b"@@"):
+            in_header = False
+            match = _HUNK.match(line)
+            if match:
+                old_left = int(match.group(1) or 1)
+                line_num = int(match.group(2))
+                new_left = int(match.group(3) or 1)
+    return files
+
+
+def iter_staged_findings(repo=".", entropy=DEFAULT_ENTROPY):
+    """
+    Yields a `Finding` for every secret on a line added in the index. Only
+    the staged diff is read, so unstaged edits in the working tree are
+    ignored and no file is opened.
+    """
+    diff, paths = _staged_diff(repo)
+    for path, lines in added_lines(diff, paths).items():
+        if not lines or not path.endswith(SCAN_EXTENSIONS):
+            continue
+        records = scan_buffer(b"\n".join(line for _, line in lines), entropy)
+        for index, content, label, column, start, end in records:
+            yield Finding(path, lines[index - 1][0], content, label, column, (start, end))
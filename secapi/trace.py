@@ -0,0 +1,204 @@
+# Lightweight tracing behind `--profile` and `--metrics-out`: time, calls and
+# bytes per phase, and the slowest files
+
+import heapq
+import sys
+import time
+
+# Hot paths check this flag before reading the clock, so tracing costs one
+# attribute lookup per call site while it is off.
+enabled = False
+
+SLOWEST_FILES = 10
+
+_phases = {}  # phase -> [calls, seconds, bytes]
+_slowest = []  # min-heap of (seconds, path, bytes), at most SLOWEST_FILES long
+_started = None
+
+
+def enable():
+    global enabled, _started
+    enabled = True
+    _started = time.perf_counter()
+
+
+def reset():
+    _phases.clear()
+    _slowest.clear()
+
+
+def add(phase, seconds, nbytes=0, calls=1):
+    """Adds one measurement (or `calls` of them) to a phase."""
+    entry = _phases.get(phase)
+    if entry is None:
+        _phases[phase] = [calls, seconds, nbytes]
+    else:
+        entry[0] += calls
+        entry[1] += seconds
+        entry[2] += nbytes
+
+
+def file_done(path, seconds, nbytes=0):
+    """Records the total time spent on one file, for the slowest-files list."""
+    item = (seconds, path, nbytes)
+    if len(_slowest) < SLOWEST_FILES:
+        heapq.heappush(_slowest, item)
+    elif item > _slowest[0]:
+        heapq.heapreplace(_slowest, item)
+
+
+class _Span:
+    __slots__ = ("phase", "bytes", "_start")
+
+    def __init__(self, phase, nbytes):
+        self.phase = phase
+        self.bytes = nbytes
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        add(self.phase, time.perf_counter() - self._start, self.bytes)
+
+
+class _NullSpan:
+    """Stands in for a span while tracing is off; setting `bytes` on it is harmless."""
+
+    bytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(phase, nbytes=0):
+    """
+    Times a block as one call of `phase`: `with trace.span("vault.read") as s:`.
+    Set `s.bytes` inside the block when the size is only known there.
+    """
+    return _Span(phase, nbytes) if enabled else _NULL_SPAN
+
+
+def traced_iter(phase, iterable):
+    """Yields from `iterable`, adding the time spent producing each item to `phase`."""
+    if not enabled:
+        yield from iterable
+        return
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            add(phase, time.perf_counter() - start, calls=0)
+            return
+        add(phase, time.perf_counter() - start)
+        yield item
+
+
+def snapshot():
+    """Everything recorded so far, as plain data that pickles and serialises."""
+    return {
+        "wall_seconds": time.perf_counter() - _started if _started is not None else 0.0,
+        "phases": {phase: {"calls": calls, "seconds": seconds, "bytes": nbytes}
+                   for phase, (calls, seconds, nbytes) in sorted(_phases.items())},
+        "slowest_files": [{"path": path, "seconds": seconds, "bytes": nbytes}
+                          for seconds, path, nbytes in sorted(_slowest, reverse=True)],
+    }
+
+
+def merge(stats):
+    """Folds in a `snapshot()` taken in another process, e.g. a scan worker."""
+    for phase, entry in stats["phases"].items():
+        add(phase, entry["seconds"], entry["bytes"], entry["calls"])
+    for entry in stats["slowest_files"]:
+        file_done(entry["path"], entry["seconds"], entry["bytes"])
+
+
+def _size(nbytes):
+    for unit in ("B", "KB", "MB"):
+        if nbytes < 1024:
+            return f"{nbytes:.0f} {unit}"
+        nbytes /= 1024
+    return f"{nbytes:.1f} GB"
+
+
+def report(out=None):
+    """
+    Prints the per-phase breakdown to stderr, so it never mixes with JSONL
+    or SARIF on stdout. Phases run by worker processes or concurrent AI
+    requests can add up to more than the wall time.
+    """
+    out = out or sys.stderr
+    stats = snapshot()
+    wall = stats["wall_seconds"]
+    print(f"\n⏱️ Profile: {wall:.3f}s wall time", file=out)
+    print(f"    {'phase':28} {'calls':>8} {'time':>10} {'of wall':>8} {'bytes':>10}", file=out)
+    for phase, entry in sorted(stats["phases"].items(), key=lambda item: -item[1]["seconds"]):
+        share = entry["seconds"] / wall if wall else 0.0
+        size = _size(entry["bytes"]) if entry["bytes"] else "-"
+        print(f"    {phase:28} {entry['calls']:>8} {entry['seconds']:>9.3f}s {share:>8.1%} {size:>10}", file=out)
+    if stats["slowest_files"]:
+        print("🐢 Slowest files:", file=out)
+        for entry in stats["slowest_files"]:
+            print(f"    {entry['seconds'] * 1000:8.1f} ms  {entry['path']} ({_size(entry['bytes'])})", file=out)
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def prometheus_text(stats):
+    """Renders a snapshot in the Prometheus text exposition format."""
+    lines = [
+        "# HELP secapi_wall_seconds Wall time of the secapi run.",
+        "# TYPE secapi_wall_seconds gauge",
+        f"secapi_wall_seconds {stats['wall_seconds']:.6f}",
+    ]
+    for metric, field, help_text in (
+        ("secapi_phase_seconds_total", "seconds", "Time spent in each phase."),
+        ("secapi_phase_calls_total", "calls", "Calls of each phase."),
+        ("secapi_phase_bytes_total", "bytes", "Bytes handled by each phase."),
+    ):
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+        for phase, entry in stats["phases"].items():
+            value = f"{entry[field]:.6f}" if field == "seconds" else entry[field]
+            lines.append(f'{metric}{{phase="{_label(phase)}"}} {value}')
+    lines += ["# HELP secapi_slow_file_seconds Time spent on each of the slowest files.",
+              "# TYPE secapi_slow_file_seconds gauge"]
+    for entry in stats["slowest_files"]:
+        lines.append(f'secapi_slow_file_seconds{{path="{_label(entry["path"])}"}} {entry["seconds"]:.6f}')
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(path):
+    """
+    Writes the snapshot to `path`: the Prometheus textfile format for a
+    `.prom` path, JSON otherwise. The file is replaced atomically, as the
+    node_exporter textfile collector expects.
+    """
+    import json
+    import os
+    stats = snapshot()
+    text = prometheus_text(stats) if path.endswith(".prom") else json.dumps(stats, indent=2) + "\n"
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def finish(profile=False, metrics_out=None):
+    """Prints the report and writes the metrics file, as requested on the command line."""
+    if profile:
+        report()
+    if metrics_out:
+        try:
+            write_metrics(metrics_out)
+        except OSError as e:
+            print(f"❌ Could not write metrics to '{metrics_out}': {e}", file=sys.stderr)
@@ -0,0 +1,218 @@
+# Local unlock agent: holds the vault key in memory and serves decrypted keys
+# over a Unix domain socket, like ssh-agent
+
+import base64
+import json
+import os
+import sys
+import time
+
+from secapi.vault_store import open_store
+
+DEFAULT_TTL = 15 * 60
+CLIENT_TIMEOUT = 1.0
+
+# `socket` is imported where it is used: every load_key checks for an agent,
+# and most of the time there is none, so it should cost one stat and no more.
+
+
+def socket_path():
+    """`$SECAPI_AGENT_SOCK`, or a socket in a per-user directory only the user can enter."""
+    if os.environ.get("SECAPI_AGENT_SOCK"):
+        return os.environ["SECAPI_AGENT_SOCK"]
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or os.path.join(os.environ.get("TMPDIR", "/tmp"), f"secapi-{os.getuid()}")
+    return os.path.join(runtime_dir, "secapi-agent.sock")
+
+
+def _peer_uid(conn):
+    """The uid of the process on the other end, or None where the OS cannot tell."""
+    import socket
+    import struct
+    if hasattr(socket, "SO_PEERCRED"):
+        creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+        return struct.unpack("3i", creds)[1]
+    return None
+
+
+def _recv_line(conn):
+    data = b""
+    while not data.endswith(b"\n"):
+        chunk = conn.recv(65536)
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def _handle(request, fernet, store, decrypted, fingerprint_key=None):
+    op = request.get("op")
+    if op == "ping":
+        return {"ok": True}
+    if op not in ("get", "fingerprint_key"):
+        return {"error": f"unknown op {op!r}"}
+    if request.get("vault") != store.path:
+        return {"error": "vault mismatch"}
+    if op == "fingerprint_key":
+        if fingerprint_key is None:
+            return {"error": "no fingerprint key"}
+        return {"key": base64.b64encode(fingerprint_key).decode()}
+
+    vault = store.get("keys")
+    missing = [name for name in request["keys"] if name not in vault]
+    if missing:
+        return {"missing": missing}
+    values = []
+    for name in request["keys"]:
+        encrypted = vault[name]
+        if encrypted not in decrypted:
+            decrypted[encrypted] = fernet.decrypt(encrypted.encode()).decode()
+        values.append(decrypted[encrypted])
+    return {"values": values}
+
+
+def serve(fernet, vault_path, ttl=DEFAULT_TTL, path=None, fingerprint_key=None):
+    """
+    Answers requests on the agent socket until `ttl` seconds pass or a
+    `lock` request arrives. Connections from other users are refused.
+    `fingerprint_key` lets `secapi check` recognise vaulted secrets while
+    the agent runs.
+    """
+    import socket
+    path = path or socket_path()
+    store = open_store(vault_path)
+    decrypted = {}
+    deadline = time.monotonic() + ttl
+    uid = os.getuid()
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        server.bind(path)
+        os.chmod(path, 0o600)
+        server.listen(16)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            server.settimeout(remaining)
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                break
+            with conn:
+                conn.settimeout(CLIENT_TIMEOUT)
+                try:
+                    peer = _peer_uid(conn)
+                    if peer is not None and peer != uid:
+                        continue
+                    request = json.loads(_recv_line(conn))
+                    if request.get("op") == "lock":
+                        conn.sendall(b'{"ok":true}\n')
+                        break
+                    try:
+                        reply = _handle(request, fernet, store, decrypted, fingerprint_key)
+                    except Exception as e:
+                        reply = {"error": str(e) or type(e).__name__}
+                    conn.sendall(json.dumps(reply).encode() + b"\n")
+                except (OSError, ValueError):
+                    continue
+    finally:
+        server.close()
+        decrypted.clear()
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def request(message, path=None):
+    """
+    Sends one request to the agent; returns the reply, or None if no agent
+    owned by this user is listening.
+    """
+    if not hasattr(os, "getuid"):
+        return None  # No Unix domain sockets on Windows
+    path = path or socket_path()
+    if not os.path.exists(path):
+        return None
+    import socket
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(CLIENT_TIMEOUT)
+            conn.connect(path)
+            if _peer_uid(conn) not in (None, os.getuid()):
+                return None
+            conn.sendall(json.dumps(message).encode() + b"\n")
+            return json.loads(_recv_line(conn))
+    except (OSError, ValueError):
+        return None
+
+
+def fetch_keys(vault_path, key_names):
+    """
+    Asks a running agent for decrypted keys. Returns the values in order,
+    or None if there is no usable agent, so the caller can fall back to
+    reading the vault itself.
+    """
+    reply = request({"op": "get", "vault": vault_path, "keys": list(key_names)})
+    if not reply:
+        return None
+    missing = reply.get("missing")
+    if missing and len(missing) == 1:
+        raise KeyError(f"Key '{missing[0]}' not found in the vault.")
+    if missing:
+        raise KeyError(f"Keys {', '.join(repr(name) for name in missing)} not found in the vault.")
+    return reply.get("values")
+
+
+def fetch_fingerprint_key(vault_path):
+    """The fingerprint key held by a running agent, or None."""
+    reply = request({"op": "fingerprint_key", "vault": vault_path})
+    if not reply or "key" not in reply:
+        return None
+    return base64.b64decode(reply["key"])
+
+
+def start(fernet, vault_path, ttl=DEFAULT_TTL, fingerprint_key=None):
+    """Forks a detached agent holding `fernet` and returns once its socket is ready."""
+    import socket
+    if not hasattr(socket, "AF_UNIX") or not hasattr(os, "fork"):
+        print("❌ The unlock agent needs Unix domain sockets and fork().")
+        return False
+    path = socket_path()
+    if request({"op": "ping"}, path):
+        request({"op": "lock"}, path)
+        for _ in range(100):  # The old agent removes its socket on the way out
+            if not os.path.exists(path):
+                break
+            time.sleep(0.01)
+    if os.path.exists(path):
+        os.unlink(path)  # Left behind by an agent that died
+    directory = os.path.dirname(path)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    st = os.stat(directory)
+    if st.st_uid != os.getuid() or st.st_mode & 0o022:
+        print(f"❌ Refusing to start the unlock agent: {directory} is writable by other users.")
+        return False
+
+    pid = os.fork()
+    if pid == 0:
+        os.setsid()
+        devnull = os.open(os.devnull, os.O_RDWR)
+        for fd in (0, 1, 2):
+            os.dup2(devnull, fd)
+        try:
+            serve(fernet, vault_path, ttl, path, fingerprint_key)
+        finally:
+            os._exit(0)
+
+    for _ in range(100):
+        if request({"op": "ping"}, path):
+            return True
+        time.sleep(0.01)
+    print("❌ The unlock agent did not start.", file=sys.stderr)
+    return False
+
+
+def stop():
+    """Asks the running agent to forget its key and exit; returns False if none was running."""
+    return bool(request({"op": "lock"}))
@@ -0,0 +1,274 @@
+# Append-only record log behind the vault file
+
+import contextlib
+import json
+import os
+import time
+
+from secapi import trace
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, single-process use only
+    fcntl = None
+
+FORMAT = "secapi-vault"
+FORMAT_VERSION = 1
+
+# The log is rewritten once it holds this many more records than live entries.
+COMPACT_MIN_GARBAGE = 64
+
+# A vault modified this recently may change again within the filesystem's
+# timestamp granularity, so its bytes are compared instead of its stat.
+RACY_WINDOW_NS = 2 * 10**9
+
+
+def _stat_signature(st):
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns)
+
+
+def _record(ns, key, value=None):
+    """One log line: `[ns, key, value]` for a put, `[ns, key]` for a delete."""
+    record = [ns, key] if value is None else [ns, key, value]
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def parse(raw):
+    """
+    Replays a vault file into `({namespace: {key: value}}, record_count)`.
+    A legacy vault (one JSON object of encrypted keys) reads as the `keys`
+    namespace, and a torn record at the end of the log is ignored.
+    """
+    head, _, body = raw.partition(b"\n")
+    header = None
+    if len(head) < 256:
+        try:
+            header = json.loads(head)
+        except ValueError:
+            pass
+    if not (isinstance(header, dict) and header.get("format") == FORMAT):
+        legacy = json.loads(raw) if raw.strip() else {}
+        return {"keys": legacy}, 0
+
+    if header.get("version", 0) > FORMAT_VERSION:
+        raise ValueError("Vault was written by a newer version of secapi.")
+    lines = [line for line in body.split(b"\n") if line]
+    try:
+        records = json.loads(b"[" + b",".join(lines) + b"]")
+    except ValueError:
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+
+    data = {}
+    for record in records:
+        entries = data.setdefault(record[0], {})
+        if len(record) == 3:
+            entries[record[1]] = record[2]
+        else:
+            entries.pop(record[1], None)
+    return data, len(records)
+
+
+class VaultStore:
+    """
+    A vault file holding namespaced entries (`keys`, `meta`, ...) as an
+    append-only log of put/delete records. Writes append under an exclusive
+    `fcntl` lock and are fsynced. Compaction and the migration of a legacy
+    JSON vault write a new file and rename it into place, so readers never
+    see a partial vault.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self._cache = None  # (stat signature, raw bytes, data, record count)
+        self._lock_depth = 0
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def _load(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._cache = None
+            return {}, 0
+        signature = _stat_signature(st)
+        cached = self._cache
+        if cached and cached[0] == signature and time.time_ns() - st.st_mtime_ns >= RACY_WINDOW_NS:
+            return cached[2], cached[3]
+
+        with trace.span("vault.read") as span:
+            with open(self.path, 'rb') as f:
+                raw = f.read()
+            span.bytes = len(raw)
+        if cached and cached[1] == raw:
+            data, count = cached[2], cached[3]
+        else:
+            with trace.span("vault.parse", len(raw)):
+                data, count = parse(raw)
+        self._cache = (signature, raw, data, count)
+        return data, count
+
+    def get(self, ns):
+        """Returns the entries of a namespace. The dict is shared; do not modify it."""
+        return self._load()[0].get(ns, {})
+
+    def invalidate(self):
+        self._cache = None
+
+    @contextlib.contextmanager
+    def lock(self):
+        """
+        Holds the vault's exclusive lock, shared by every secapi process.
+        Re-entrant, so a read-modify-write can wrap `write` or `replace`.
+        """
+        if fcntl is None or self._lock_depth:
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+            return
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            self._lock_depth = 1
+            yield
+        finally:
+            self._lock_depth = 0
+            os.close(fd)
+
+    def _is_log(self):
+        try:
+            with open(self.path, 'rb') as f:
+                header = json.loads(f.readline())
+        except (OSError, ValueError):
+            return False
+        return isinstance(header, dict) and header.get("format") == FORMAT
+
+    def _rewrite(self, data):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({"format": FORMAT, "version": FORMAT_VERSION}) + "\n")
+            for ns, entries in data.items():
+                f.writelines(_record(ns, key, value) for key, value in entries.items())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._fsync_dir()
+        self.invalidate()
+
+    def _fsync_dir(self):
+        try:
+            fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def _backup_legacy(self):
+        """Keeps a legacy JSON vault as `<path>.bak` before it is first rewritten."""
+        if not self.exists() or self._is_log():
+            return
+        backup = f"{self.path}.bak"
+        with open(self.path, 'rb') as f:
+            raw = f.read()
+        fd = os.open(backup, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(raw)
+        print(f"🔄 Migrated vault to the log format (backup: {backup}).")
+
+    def discard_backup(self):
+        """
+        Removes the `<path>.bak` of a legacy vault once its entries live on
+        under the new encryption; it still holds them under the old scheme.
+        Returns whether there was one.
+        """
+        try:
+            os.remove(f"{self.path}.bak")
+        except FileNotFoundError:
+            return False
+        return True
+
+    def write(self, records, purge=False):
+        """
+        Applies `(ns, key, value)` records in one append; a value of None
+        deletes the key. Compacts the log when it is mostly dead records.
+        With `purge`, the vault is rewritten instead, so the values these
+        records replace or delete are gone from disk at once.
+        """
+        if not records:
+            return
+        with self.lock():
+            if purge:
+                data = {ns: dict(entries) for ns, entries in self._load()[0].items()}
+                for ns, key, value in records:
+                    if value is None:
+                        data.get(ns, {}).pop(key, None)
+                    else:
+                        data.setdefault(ns, {})[key] = value
+                self._backup_legacy()
+                self._rewrite(data)
+                return
+            if not self.exists() or not self._is_log():
+                self._backup_legacy()
+                self._rewrite(self._load()[0])
+            data, count = self._load()
+            raw = self._cache[1]
+            payload = "".join(_record(ns, key, value) for ns, key, value in records).encode('utf-8')
+            # Start on a fresh line if a crashed writer left a torn record.
+            if raw and not raw.endswith(b"\n"):
+                payload = b"\n" + payload
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+            try:
+                os.write(fd, payload)
+                os.fsync(fd)
+                signature = _stat_signature(os.fstat(fd))
+            finally:
+                os.close(fd)
+
+            # Apply the records to a copy of the cached entries instead of
+            # reading the file back.
+            data = dict(data)
+            for ns in {ns for ns, _, _ in records}:
+                data[ns] = dict(data.get(ns, {}))
+            for ns, key, value in records:
+                if value is None:
+                    data[ns].pop(key, None)
+                else:
+                    data[ns][key] = value
+            count += len(records)
+            self._cache = (signature, raw + payload, data, count)
+
+            live = sum(len(entries) for entries in data.values())
+            if count - live > max(COMPACT_MIN_GARBAGE, live):
+                self._rewrite(data)
+
+    def replace(self, namespaces):
+        """Atomically swaps whole namespaces (`{ns: entries}`), e.g. after re-encryption."""
+        with self.lock():
+            self._backup_legacy()
+            data = dict(self._load()[0])
+            data.update((ns, dict(entries)) for ns, entries in namespaces.items())
+            self._rewrite(data)
+
+
+_stores = {}
+
+
+def open_store(path):
+    """Returns the process-wide store for a vault path, so its cache is shared."""
+    store = _stores.get(path)
+    if store is None:
+        store = _stores[path] = VaultStore(path)
+    return store
@@ -0,0 +1,151 @@
+# Shared directory walker for the regex and AI scanners
+
+import os
+import re
+
+# File types each scanner looks at. This is the only place they are defined.
+SCAN_EXTENSIONS = ('.py', '.js', '.ts', '.env', '.json', '.yml', '.yaml', '.txt')
+AI_SCAN_EXTENSIONS = ('.py', '.js', '.ts', '.env', '.json', '.yml')
+
+# Directories that never hold first-party source, pruned before descending.
+PRUNED_DIRS = {
+    ".git", ".hg", ".svn",
+    "node_modules", "bower_components",
+    ".venv", "venv", "site-packages", "__pycache__",
+    ".tox", ".nox", ".mypy_cache", ".pytest_cache", ".ruff_cache",
+    "build", "dist", ".eggs", ".next", ".cache",
+}
+
+IGNORE_FILES = (".gitignore", ".secapiignore")
+
+
+def _translate(pattern):
+    """Translates a gitignore glob into a regular expression."""
+    regex, i = "", 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            regex += "/.*"
+            i += 3
+        elif pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+        elif pattern[i] == "*":
+            regex += "[^/]*"
+            i += 1
+        elif pattern[i] == "?":
+            regex += "[^/]"
+            i += 1
+        elif pattern[i] == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                regex += re.escape("[")
+                i += 1
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                regex += f"[{body}]"
+                i = end + 1
+        elif pattern[i] == "\\" and i + 1 < len(pattern):
+            regex += re.escape(pattern[i + 1])
+            i += 2
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return regex
+
+
+def parse_ignore_file(path, base):
+    """
+    Parses a .gitignore-style file into `(regex, negate, dir_only, base)`
+    rules, where `base` is the directory of the file relative to the walk root.
+    """
+    rules = []
+    try:
+        with open(path, 'r', errors='ignore') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return rules
+    for line in lines:
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        anchored = "/" in line
+        line = line.lstrip("/")
+        regex = _translate(line)
+        if not anchored:
+            regex = "(?:.*/)?" + regex
+        rules.append((re.compile(regex, re.S), negate, dir_only, base))
+    return rules
+
+
+def is_ignored(rules, rel_path, is_dir):
+    """Applies `rules` in order to a path relative to the walk root; the last match wins."""
+    ignored = False
+    for regex, negate, dir_only, base in rules:
+        if dir_only and not is_dir:
+            continue
+        if base:
+            if not rel_path.startswith(base + "/"):
+                continue
+            candidate = rel_path[len(base) + 1:]
+        else:
+            candidate = rel_path
+        if regex.fullmatch(candidate):
+            ignored = not negate
+    return ignored
+
+
+def walk(root, extensions=SCAN_EXTENSIONS, use_ignore_files=True):
+    """
+    Yields the paths of files under `root` whose names end with one of
+    `extensions`, in sorted order (each directory's files, then its
+    subdirectories). PRUNED_DIRS and anything matched by a .gitignore or
+    .secapiignore inside the tree is skipped without being descended into.
+    """
+    yield from _walk(root, "", [], extensions, use_ignore_files)
+
+
+def _walk(path, rel, rules, extensions, use_ignore_files):
+    try:
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+    except OSError:
+        return
+
+    if use_ignore_files:
+        names = {entry.name for entry in entries}
+        for name in IGNORE_FILES:
+            if name in names:
+                rules = rules + parse_ignore_file(os.path.join(path, name), rel)
+
+    subdirs = []
+    for entry in entries:
+        entry_rel = f"{rel}/{entry.name}" if rel else entry.name
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        if is_dir:
+            if entry.name in PRUNED_DIRS or entry.is_symlink():
+                continue
+            if rules and is_ignored(rules, entry_rel, True):
+                continue
+            subdirs.append((entry, entry_rel))
+        elif entry.name.endswith(extensions):
+            if rules and is_ignored(rules, entry_rel, False):
+                continue
+            yield entry.path
+
+    for entry, entry_rel in subdirs:
+        yield from _walk(entry.path, entry_rel, rules, extensions, use_ignore_files)
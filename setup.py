@@ -8,6 +8,10 @@ setup(
         'cryptography>=41.0.0',
         'openai',
     ],
+    extras_require={
+        'entropy': ['numpy'],  # Vectorized scoring for the high-entropy detector
+        'http2': ['h2'],  # One multiplexed HTTP/2 connection for the agent
+    },
     entry_points={
         'console_scripts': [
             'secapi=secapi.cli:main',  # This enables the `secapi` command
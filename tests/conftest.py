@@ -0,0 +1,26 @@
+import pytest
+
+from secapi import secure
+
+
+@pytest.fixture
+def vault(tmp_path, monkeypatch):
+    """A fresh vault path with cheap scrypt and no unlock agent."""
+    path = str(tmp_path / "vault.json")
+    monkeypatch.setattr(secure, "VAULT_PATH", path)
+    monkeypatch.setattr(secure, "_fernet_instance", None)
+    monkeypatch.setattr(secure, "_data_key", None)
+    monkeypatch.setattr(secure, "_fingerprint_index", None)
+    monkeypatch.setattr(secure, "fetch_keys", lambda *args: None)
+    monkeypatch.setattr(secure, "fetch_fingerprint_key", lambda *args: None)
+    monkeypatch.setattr(secure, "SCRYPT_N", 2 ** 10)
+    return path
+
+
+@pytest.fixture
+def password(monkeypatch):
+    """Answers password prompts with the given replies, in order."""
+    def answer(*replies):
+        replies = iter(replies)
+        monkeypatch.setattr(secure, "getpass", lambda prompt="": next(replies))
+    return answer
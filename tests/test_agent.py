@@ -0,0 +1,63 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from secapi.agent import MAX_COMMAND_CHARS, SecAPIAgent
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def agent():
+    return SecAPIAgent(client=object(), deployment="stub")
+
+
+def test_typos_and_aliases_resolve_locally():
+    bot = agent()
+    assert bot.match_local("lsit") == ("list", None)
+    assert bot.match_local("scan ./src") == ("check", "./src")
+    assert bot.match_local("delete openai_key") == ("delete", "openai_key")
+
+
+def test_destructive_commands_need_the_exact_word():
+    bot = agent()
+    for text in ("deleted stuff", "delte openai_key", "rm openai_key", "remove openai_key", "rotat openai_key",
+                 "rm -rf", "delete -rf", "edit"):
+        assert bot.match_local(text) is None, text
+
+
+def test_arguments_keep_their_case():
+    bot = agent()
+    assert bot.match_local("check ./Src/Keys") == ("check", "./Src/Keys")
+    assert bot.match_local("Delete OpenAI_Key") == ("delete", "OpenAI_Key")
+    assert bot.parse_command("ROTATE Stripe_Live") == ("rotate", "Stripe_Live")
+
+
+def test_agent_does_not_load_the_scanner():
+    code = "import sys, secapi.agent; print('secapi.scanner' in sys.modules)"
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True).stdout
+    assert out.strip() == "False"
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("", None),
+    ("li", None),  # May still become "list"
+    ("list", None),
+    ("list\n", "command"),
+    ("  EXIT ", "command"),
+    ("delete openai_key", None),  # The argument may still be growing
+    ("delete openai_key\n", "command"),
+    ("check ./src\nThat scans the folder.", "command"),
+    ("delete " + "x" * MAX_COMMAND_CHARS, "chat"),
+    ("hello", "chat"),
+    ("Sure, I can help", "chat"),
+    ("deleted ", "chat"),
+    ("listing", "chat"),
+])
+def test_classify_reply(text, expected):
+    bot = agent()
+    assert bot.classify_reply(text) == expected
+    if expected == "command":
+        assert bot.parse_command(text.split("\n", 1)[0])[0] not in ("chat", None)
@@ -0,0 +1,59 @@
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from secapi import ai_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from stub_server import StubServer  # noqa: E402
+
+openai = pytest.importorskip("openai")
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def test_rate_limited_requests_wait_for_retry_after(monkeypatch):
+    delays = []
+    retry_delay = ai_engine.retry_delay
+
+    def recorded(*args):
+        delays.append(retry_delay(*args))
+        return delays[-1]
+    monkeypatch.setattr(ai_engine, "retry_delay", recorded)
+
+    with StubServer("📄 1", latency=0, rate_limit_every=2, retry_after="0.3") as stub:
+        client = openai.AsyncOpenAI(base_url=stub.url, api_key="stub", max_retries=0)
+        started = time.perf_counter()
+        replies = ai_engine.complete_all([MESSAGES, MESSAGES], concurrency=1, client=client)
+        elapsed = time.perf_counter() - started
+
+    assert replies == ["📄 1", "📄 1"]
+    assert (stub.requests, stub.rate_limited) == (3, 1)
+    assert delays == [0.3]
+    assert elapsed >= 0.3
+
+
+def test_requests_give_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr(ai_engine, "MAX_RETRIES", 2)
+    with StubServer("", latency=0, rate_limit_every=1, retry_after="0") as stub:
+        client = openai.AsyncOpenAI(base_url=stub.url, api_key="stub", max_retries=0)
+        [reply] = ai_engine.complete_all([MESSAGES], client=client)
+
+    assert isinstance(reply, openai.RateLimitError)
+    assert stub.requests == 3
+
+
+@pytest.mark.parametrize("headers, expected", [
+    ({"retry-after-ms": "250"}, 0.25),
+    ({"retry-after": "2"}, 2.0),
+    ({"retry-after": "-1"}, 0.0),
+])
+def test_retry_delay_follows_the_server(headers, expected):
+    assert ai_engine.retry_delay(SimpleNamespace(headers=headers), 3) == expected
+
+
+def test_retry_delay_backs_off_without_a_header():
+    assert 0.5 * ai_engine.BACKOFF_BASE * 8 <= ai_engine.retry_delay(None, 3) <= ai_engine.BACKOFF_BASE * 8
@@ -0,0 +1,59 @@
+import os
+import stat
+
+from secapi import bulk, secure
+
+
+def test_export_over_an_open_file_is_readable_only_by_the_user(tmp_path, monkeypatch):
+    monkeypatch.setattr(bulk, "load_keys", lambda names: ["sk_live_abc" for _ in names])
+    path = tmp_path / "backup.env"
+    path.write_text("OLD=1\n")
+    os.chmod(path, 0o644)
+
+    bulk.export_secrets(str(path), ["stripe_key"])
+
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert path.read_text() == 'stripe_key="sk_live_abc"\n'
+    assert os.listdir(tmp_path) == ["backup.env"]
+
+
+SECRETS = {"stripe_key": "sk_live_abc", "db-url": "postgres://u:p@h/db?x=1#frag", "quoted": 'say "hi"\nbye'}
+
+
+def test_import_then_export_round_trips(vault, password, tmp_path):
+    password("pw")
+    source = tmp_path / "in.env"
+    source.write_text(
+        "# comment\n"
+        "export stripe_key=sk_live_abc  # trailing comment\n"
+        "db-url='postgres://u:p@h/db?x=1#frag'\n"
+        'quoted="say \\"hi\\"\\nbye"\n'
+        "empty=\n"
+    )
+    bulk.import_secrets(str(source))
+    assert sorted(secure.key_names()) == sorted(SECRETS)
+
+    bulk.export_secrets(str(tmp_path / "out.env"))
+    assert bulk.read_secrets_file(str(tmp_path / "out.env")) == SECRETS
+    bulk.export_secrets(str(tmp_path / "out.json"), ["quoted"])
+    assert bulk.read_secrets_file(str(tmp_path / "out.json")) == {"quoted": SECRETS["quoted"]}
+
+    (tmp_path / "more.json").write_text('{"stripe_key": "sk_live_new", "port": 5432}')
+    bulk.import_secrets(str(tmp_path / "more.json"))
+    assert secure.load_keys(["stripe_key", "port"]) == ["sk_live_new", "5432"]
+
+
+def test_exec_passes_keys_in_the_environment(vault, password, monkeypatch):
+    password("pw")
+    secure.store_secrets(SECRETS)
+    calls = []
+    monkeypatch.setattr(bulk.os, "execvpe", lambda file, args, env: calls.append((file, args, env)))
+
+    bulk.exec_with_keys(["env"], ["db-url"])
+    [(file, args, env)] = calls
+    assert (file, args) == ("env", ["env"])
+    assert env["DB_URL"] == SECRETS["db-url"] and "STRIPE_KEY" not in env
+
+    bulk.exec_with_keys(["env"])
+    assert {name: calls[-1][2][name] for name in ("STRIPE_KEY", "DB_URL", "QUOTED")} == {
+        bulk.env_name(name): value for name, value in SECRETS.items()}
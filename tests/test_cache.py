@@ -0,0 +1,155 @@
+import os
+import stat
+import time
+
+import pytest
+
+from secapi import scan_cache, scanner
+from secapi.entropy import EntropyDetector
+from secapi.scan_cache import ScanCache
+
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_scan_cache_is_readable_only_by_the_user(tmp_path):
+    cache_dir = tmp_path / "secapi"
+    cache_dir.mkdir(mode=0o755)
+    cache = ScanCache(str(tmp_path / "project"), "sig", cache_dir=str(cache_dir))
+    cache.put("app.py", [1, 2, "abc", [[3, 'key = "sk_live_abc"', "Stripe", 7, 0, 11]]])
+    cache.save()
+
+    assert mode(cache.path) == 0o600
+    assert mode(cache_dir) == 0o700
+
+
+def test_ai_cache_entries_are_readable_only_by_the_user(tmp_path):
+    from secapi.ai_cache import AICache
+
+    cache = AICache(cache_dir=str(tmp_path))
+    cache.put("ab" * 32, [(3, 'key = "sk_live_abc"')])
+
+    path = cache._path("ab" * 32)
+    assert mode(path) == 0o600
+    assert mode(os.path.dirname(path)) == 0o700
+    assert cache.get("ab" * 32) == [(3, 'key = "sk_live_abc"')]
+
+
+STRIPE = "sk_live_" + "4eC39HqLyjWDarjtT1zdp7dc"
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    monkeypatch.setattr(scan_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    root = tmp_path / "project"
+    root.mkdir()
+    (root / "app.py").write_text(f'stripe = "{STRIPE}"\n')
+    return root
+
+
+def settle(path):
+    """Backdates a file past the racy window, so its mtime is trusted."""
+    past = time.time() - 60
+    os.utime(path, (past, past))
+
+
+def count_calls(monkeypatch, module, name):
+    calls = []
+    original = getattr(module, name)
+
+    def counted(*args, **kwargs):
+        calls.append(args)
+        return original(*args, **kwargs)
+    monkeypatch.setattr(module, name, counted)
+    return calls
+
+
+def lines(root, **kwargs):
+    return [finding.line for finding in scanner.scan_directory(str(root), cache=True, **kwargs)]
+
+
+def test_unchanged_file_is_not_read_again(project, monkeypatch):
+    settle(project / "app.py")
+    assert lines(project) == [1]
+    reads = count_calls(monkeypatch, scanner, "open_buffer")
+    assert lines(project) == [1]
+    assert reads == []
+
+
+def test_changed_file_is_rescanned(project):
+    settle(project / "app.py")
+    assert lines(project) == [1]
+    (project / "app.py").write_text(f'import os\n\nstripe = "{STRIPE}"\n')
+    settle(project / "app.py")
+    assert lines(project) == [3]
+
+
+def test_file_in_the_racy_window_is_hashed_but_not_rescanned(project, monkeypatch):
+    assert lines(project) == [1]
+    cache = scan_cache.ScanCache(str(project), scanner.scan_signature())
+    assert cache.get(str(project / "app.py"))[1] == -1
+
+    scans = count_calls(monkeypatch, scanner, "scan_buffer")
+    reads = count_calls(monkeypatch, scanner, "open_buffer")
+    assert lines(project) == [1]
+    assert len(reads) == 1 and scans == []
+
+
+def test_other_entropy_settings_invalidate_the_cache(project, monkeypatch):
+    settle(project / "app.py")
+    assert lines(project) == [1]
+    scans = count_calls(monkeypatch, scanner, "scan_buffer")
+    assert lines(project, entropy=EntropyDetector(hex_threshold=0.5)) == [1]
+    assert len(scans) == 1
+
+
+@pytest.fixture
+def ai_project(project, monkeypatch):
+    from secapi import ai_cache, scanner_ai
+
+    monkeypatch.setattr(ai_cache, "CACHE_DIR", scan_cache.CACHE_DIR)
+    monkeypatch.setattr(scanner_ai, "handle_findings", lambda path, findings: None)
+    sent = []
+
+    def complete_all(requests, concurrency, client):
+        sent.extend(requests)
+        return ["📄 1\n🧪 1: stripe = ..."] * len(requests)
+    monkeypatch.setattr(scanner_ai, "complete_all", complete_all)
+    return scanner_ai, sent
+
+
+def test_ai_scan_sends_only_chunks_it_has_no_answer_for(ai_project, project):
+    scanner_ai, sent = ai_project
+    path = str(project / "app.py")
+    scanner_ai.ai_scan_files([path])
+    assert len(sent) == 1
+
+    scanner_ai.ai_scan_files([path])
+    assert len(sent) == 1
+
+    (project / "app.py").write_text(f'import os\nstripe = "{STRIPE}"\n')
+    scanner_ai.ai_scan_files([path])
+    assert len(sent) == 2
+
+
+def test_ai_cache_key_covers_the_model_and_prompt():
+    from secapi.ai_cache import cache_key
+
+    keys = {cache_key("x = 1"), cache_key("x = 1", model="other"), cache_key("x = 1", prompt_version="0"),
+            cache_key("x = 1", temperature=1.0), cache_key("x = 2")}
+    assert len(keys) == 5
+
+
+def test_ai_cache_evicts_the_least_recently_used(tmp_path):
+    from secapi.ai_cache import AICache
+
+    cache = AICache(cache_dir=str(tmp_path), max_bytes=100)
+    for n, key in enumerate(("aa" * 32, "bb" * 32, "cc" * 32)):
+        cache.put(key, [(1, "x" * 30)])
+        os.utime(cache._path(key), (1000 + n, time.time() - 100 + n))
+    cache.get("aa" * 32)
+
+    assert cache.evict() == 1
+    assert cache.get("bb" * 32) is None
+    assert cache.get("aa" * 32) and cache.get("cc" * 32)
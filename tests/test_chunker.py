@@ -0,0 +1,30 @@
+import json
+
+from secapi.chunker import CHARS_PER_TOKEN, CHUNK_TOKENS, chunk_text
+
+STRIPE = "sk_live_" + "4eC39HqLyjWDarjtT1zdp7dc"
+
+
+def test_secret_past_the_chunk_budget_on_one_long_line_is_sent():
+    text = json.dumps({"padding": "x " * 3500, "stripe": STRIPE})
+    assert len(text) > CHUNK_TOKENS * CHARS_PER_TOKEN
+
+    candidates, total = chunk_text("config.json", text)
+
+    assert total > 1
+    assert [chunk.start for chunk in candidates] == [1]
+    assert any(STRIPE in chunk.lines[0] for chunk in candidates)
+    assert all(chunk.to_file_line(1) == 1 for chunk in candidates)
+
+
+def test_column_windows_cover_the_whole_line_with_overlap():
+    line = "".join(chr(ord("a") + i % 26) for i in range(25000))
+    chunks, _ = chunk_text("min.js", f"first\n{line}\nlast\n", prefilter=False)
+
+    parts = [chunk for chunk in chunks if chunk.start == 2]
+    assert parts[0].column == 0
+    for previous, current in zip(parts, parts[1:]):
+        assert current.column < previous.column + len(previous.lines[0])
+    assert parts[-1].column + len(parts[-1].lines[0]) == len(line)
+    assert parts[-1].lines[0] == line[parts[-1].column:]
+    assert [chunk.lines for chunk in chunks if chunk.start != 2] == [["first"], ["last"]]
@@ -0,0 +1,39 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STRIPE = "sk_live_" + "4eC39HqLyjWDarjtT1zdp7dc"
+
+
+def secapi(*args):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.run([sys.executable, "-m", "secapi.cli", *args], capture_output=True, text=True, env=env)
+
+
+def test_negative_jobs_are_rejected(tmp_path):
+    result = secapi("check", str(tmp_path), "--jobs", "-1")
+    assert result.returncode == 2
+    assert "--jobs must be 0" in result.stderr
+
+
+@pytest.mark.parametrize("output_format", ["jsonl", "sarif"])
+def test_machine_readable_check_exits_1_on_findings(tmp_path, output_format):
+    (tmp_path / "clean.py").write_text("print('hi')\n")
+    assert secapi("check", str(tmp_path), "--format", output_format).returncode == 0
+    (tmp_path / "app.py").write_text(f'stripe = "{STRIPE}"\n')
+    assert secapi("check", str(tmp_path), "--format", output_format).returncode == 1
+
+
+def test_sarif_uris_are_relative_to_the_scanned_directory(tmp_path):
+    (tmp_path / "my dir").mkdir()
+    (tmp_path / "my dir" / "app.py").write_text(f'stripe = "{STRIPE}"\n')
+    run = json.loads(secapi("check", str(tmp_path), "--format", "sarif").stdout)["runs"][0]
+
+    location = run["results"][0]["locations"][0]["physicalLocation"]["artifactLocation"]
+    assert location == {"uri": "my%20dir/app.py", "uriBaseId": "SRCROOT"}
+    base = run["originalUriBaseIds"]["SRCROOT"]["uri"]
+    assert base.startswith("file:///") and base.endswith("/")
@@ -0,0 +1,42 @@
+import random
+import string
+
+from secapi import entropy
+from secapi.entropy import DEFAULT_ENTROPY, EntropyDetector
+
+HEX = "0123456789abcdef"
+ALNUM = string.ascii_letters + string.digits
+
+
+def hit_rate(detector, alphabet, length, samples=500):
+    rng = random.Random(length)
+    tokens = ("".join(rng.choice(alphabet) for _ in range(length)) for _ in range(samples))
+    return sum(bool(detector.find(f'token = "{token}"')) for token in tokens) / samples
+
+
+def test_short_random_tokens_are_caught_in_either_charset():
+    assert hit_rate(DEFAULT_ENTROPY, ALNUM, 20) > 0.9
+    assert hit_rate(DEFAULT_ENTROPY, ALNUM, 24) > 0.9
+    assert hit_rate(DEFAULT_ENTROPY, HEX, 40) > 0.9
+
+
+def test_identifiers_are_not_flagged():
+    for name in ("get_user_account_settings", "ThisIsSomeLongCamelCaseIdentifier", "my-service-deployment-name"):
+        assert DEFAULT_ENTROPY.find(f'name = "{name}"') == []
+
+
+def test_one_threshold_applies_to_both_charsets():
+    detector = EntropyDetector(hex_threshold=0.9, base64_threshold=0.9)
+    assert hit_rate(detector, HEX, 24) > 0.9
+    assert hit_rate(detector, ALNUM, 24) > 0.9
+
+
+def test_tokens_across_translate_windows_are_found(monkeypatch):
+    rng = random.Random(7)
+    lines = [f'k{n} = "{"".join(rng.choice(ALNUM) for _ in range(24))}"\n' if n % 3 else "pass\n" for n in range(200)]
+    buf = "".join(lines).encode()
+    whole = DEFAULT_ENTROPY.find(buf)
+    assert whole
+    for window in (1, 16, 37, 100):
+        monkeypatch.setattr(entropy, "RUNS_WINDOW", window)
+        assert DEFAULT_ENTROPY.find(buf) == whole, window
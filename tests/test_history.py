@@ -0,0 +1,52 @@
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STRIPE = "sk_live_" + "4eC39HqLyjWDarjtT1zdp7dc"
+RANDOM_TOKEN = "q8ZtR2vLk9WmXc4PnB7sJd1F"
+
+
+def secapi(*args):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.run([sys.executable, "-m", "secapi.cli", *args], capture_output=True, text=True, env=env)
+
+
+def commit_file(repo, name, text):
+    (repo / name).write_text(text)
+    subprocess.run(["git", "-C", str(repo), "add", name], check=True, capture_output=True)
+    subprocess.run(["git", "-C", str(repo), "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", name],
+                   check=True, capture_output=True)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    subprocess.run(["git", "init", "-q", str(tmp_path)], check=True)
+    return tmp_path
+
+
+def test_exit_status_reflects_findings(repo):
+    commit_file(repo, "app.py", "print('hello')\n")
+    assert secapi("check", str(repo), "--history").returncode == 0
+
+    commit_file(repo, "settings.py", f'STRIPE = "{STRIPE}"\n')
+    commit_file(repo, "settings.py", "STRIPE = load_key('stripe')\n")
+    result = secapi("check", str(repo), "--history", "--format", "jsonl")
+    assert result.returncode == 1
+    assert STRIPE in result.stdout
+
+
+def test_entropy_options_apply(repo):
+    commit_file(repo, "config.py", f'build_id = "{RANDOM_TOKEN}"\n')
+    assert secapi("check", str(repo), "--history").returncode == 1
+    assert secapi("check", str(repo), "--history", "--no-entropy").returncode == 0
+    assert secapi("check", str(repo), "--history", "--entropy-charset", "hex").returncode == 0
+
+
+def test_git_failure_is_an_error(tmp_path):
+    assert secapi("check", str(tmp_path), "--history").returncode == 2
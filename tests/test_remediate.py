@@ -0,0 +1,65 @@
+import pytest
+
+from secapi import remediate, secure
+from secapi.scanner import scan_file
+
+STRIPE = "sk_live_" + "4eC39HqLyjWDarjtT1zdp7dc"
+GITHUB = "ghp_" + "A1b2C3d4E5f6G7h8I9j0K1l2M3n4O5p6Q7r8"
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    monkeypatch.setattr(secure, "VAULT_PATH", str(tmp_path / "vault.json"))
+    monkeypatch.chdir(tmp_path)
+
+    def write(text, name="app.py"):
+        (tmp_path / name).write_text(text)
+        return name
+    return write
+
+
+def plan_for(path, mode="dry-run"):
+    return remediate.build_plan(scan_file(path, entropy=None), mode)
+
+
+@pytest.mark.parametrize("line, reason", [
+    (f'KEY = b"{STRIPE}"\n', "bytes literal"),
+    (f'KEY = Rb"{STRIPE}"\n', "bytes literal"),
+    (f'KEY = f"{GITHUB}"\n', "f-string"),
+    (f'KEY = """{STRIPE}"""\n', "triple-quoted string"),
+])
+def test_literals_a_call_cannot_replace_are_left_out(source, line, reason):
+    plan = plan_for(source(line))
+    assert not plan.fixes
+    assert [reason for _, reason in plan.left_out] == [reason]
+
+
+def test_string_prefix_is_replaced_with_the_literal(source):
+    plan = plan_for(source(f'KEY = r"{STRIPE}"\n'))
+    assert [fix.action for fix in plan.fixes] == ["replace"]
+    assert plan.patched("app.py")[-1] == 'KEY = load_key("key")\n'
+
+
+def test_auto_skips_a_match_inside_a_longer_string(source):
+    url = f'URL = "https://example.com/hook?token={STRIPE}&user=1"\n'
+    plan = plan_for(source(url), "auto")
+    assert {fix.reason for fix in plan.fixes} == {"the match is only part of the string"}
+    assert plan.diff() == ""
+
+
+def test_auto_skips_guids(source):
+    plan = plan_for(source('TENANT = "0f8fad5b-d9cb-469f-a165-70867728950e"\n'), "auto")
+    assert [(fix.action, fix.reason) for fix in plan.fixes] == [("skip", "Microsoft Graph findings need review")]
+
+
+def test_diff_headers_are_relative(source):
+    plan = plan_for(source(f'KEY = "{STRIPE}"\n'))
+    assert plan.diff().splitlines()[:2] == ["--- a/app.py", "+++ b/app.py"]
+
+
+def test_left_out_findings_are_reported(source, capsys):
+    path = source(f'KEY = b"{STRIPE}"\nOTHER = "{GITHUB}"\n')
+    remediate.remediate(scan_file(path, entropy=None), "dry-run")
+    out = capsys.readouterr().out
+    assert "app.py:1: left as is (bytes literal), fix it by hand" in out
+    assert "1 left for you" in out
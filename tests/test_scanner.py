@@ -0,0 +1,68 @@
+import random
+import re
+
+import pytest
+
+from secapi.scanner import PATTERNS, scan_file, scan_text
+
+STRIPE = "sk_live_" + "4eC39HqLyjWDarjtT1zdp7dc"
+GITHUB = "ghp_" + "A1b2C3d4E5f6G7h8I9j0K1l2M3n4O5p6Q7r8"
+GUID = "0f8fad5b-d9cb-469f-a165-70867728950e"
+
+# Fragments that exercise `(?i)` patterns, several labels on one line, CRLF
+# endings and a `\s` that would reach into the next line.
+FRAGMENTS = [
+    f'stripe = "{STRIPE}"',
+    f"API_KEY={STRIPE}",
+    f"Token: {GITHUB}",
+    f'SECRET = "{GUID}"',
+    f"AWS_Secret_Access_Key = {'A' * 40}",
+    "api_key =",
+    "  0123456789abcdefghij",
+    "token\t",
+    ": 0123456789abcdefghij",
+    "kEy = 'x'",
+    "nothing to see here",
+    f"url = https://example.com/?token={GITHUB}&id={GUID}",
+    "",
+    "Ünïcode kéy = 0123456789abcdefghij",
+]
+
+
+def reference(text):
+    """The per-line scan that `scan_text` must agree with."""
+    for line_num, line in enumerate(text.split("\n"), 1):
+        for label, pattern in PATTERNS.items():
+            match = re.search(pattern, line)
+            if match:
+                yield line_num, line, label, match.start(), match.end()
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_scan_text_agrees_with_a_per_line_search(seed):
+    rng = random.Random(seed)
+    lines = [rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 30))]
+    ending = rng.choice(["\n", "\r\n"])
+    text = ending.join(lines) + rng.choice(["", ending])
+    if seed % 2:
+        text = text.replace("Ünïcode", "Unicode")  # ASCII text takes the lower-cased prefilter
+
+    expected = list(reference(text))
+    assert list(scan_text(text, entropy=None)) == expected
+    assert list(scan_text(text.encode(), entropy=None)) == [
+        (line_num, line.encode(), label, len(line[:start].encode()), len(line[:end].encode()))
+        for line_num, line, label, start, end in expected
+    ]
+
+
+def test_whitespace_in_a_pattern_does_not_join_lines():
+    assert list(scan_text("api_key =\n  0123456789abcdefghij\n", entropy=None)) == []
+
+
+@pytest.mark.parametrize("ending", ["\n", "\r\n", "\r"])
+def test_files_are_numbered_like_text_mode_reading(tmp_path, ending):
+    path = tmp_path / "app.py"
+    path.write_bytes(ending.join(["import os", "", f'stripe = "{STRIPE}"', "pass"]).encode())
+    with open(path) as f:
+        expected = [n for n, line in enumerate(f, 1) if STRIPE in line]
+    assert [finding.line for finding in scan_file(str(path), entropy=None)] == expected == [3]
@@ -0,0 +1,20 @@
+import pytest
+
+from secapi.scanner_ai import split_ai_output
+
+
+@pytest.mark.parametrize("output, sections, expected", [
+    ("", 2, [[], []]),
+    ("🧪 3: key = 'x'\n🧪 5: token = 'y'", 1, [[(3, "key = 'x'"), (5, "token = 'y'")]]),
+    ("📄 1\n🧪 3: a = 'x'\n📄 2\n🧪 4: b = 'y'", 2, [[(3, "a = 'x'")], [(4, "b = 'y'")]]),
+    ("📄 2: app.py (lines 1-40)\n🧪 7: k = 'v'", 2, [[], [(7, "k = 'v'")]]),
+    ("📄 1\n🧪1: a\n📄 2\n🧪 2: b\n📄 1\n🧪 7: c", 2, [[(1, "a"), (7, "c")], [(2, "b")]]),
+    # Findings before any header, or under a header out of range, have no section.
+    ("🧪 3: a = 'x'\n📄 2\n🧪 4: b", 2, [[], [(4, "b")]]),
+    ("📄 3\n🧪 3: a\n📄 0\n🧪 4: b\n📄 1\n🧪 5: c", 2, [[(5, "c")], []]),
+    # Malformed lines and prose are skipped; surrounding whitespace is not part of a finding.
+    ("📄 1\n🧪 x: a\n🧪 3 a\nHere are the issues:\n  🧪 9:   k = 'v'  \n", 1, [[(9, "k = 'v'")]]),
+    ("```\n📄 1\n🧪 2: k = 'v'\n```", 1, [[(2, "k = 'v'")]]),
+])
+def test_split_ai_output(output, sections, expected):
+    assert split_ai_output(output, sections) == expected
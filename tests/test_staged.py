@@ -0,0 +1,85 @@
+import shutil
+import subprocess
+
+import pytest
+
+from secapi.staged import added_lines, iter_staged_findings
+
+STRIPE = "sk_live_" + "4eC39HqLyjWDarjtT1zdp7dc"
+GITHUB = "ghp_" + "A1b2C3d4E5f6G7h8I9j0K1l2M3n4O5p6Q7r8"
+
+
+def test_added_line_that_looks_like_a_header_is_content():
+    diff = (
+        b"diff --git a/x.py b/x.py\n"
+        b"--- a/x.py\n"
+        b"+++ b/x.py\n"
+        b"@@ -1,0 +2,2 @@\n"
+        b"+++ foo\n"
+        b"+k = \"secret\"\n"
+    )
+    assert added_lines(diff) == {"x.py": [(2, b"++ foo"), (3, b"k = \"secret\"")]}
+
+
+def test_hunk_counts_skip_removed_lines_and_missing_newline_markers():
+    diff = (
+        b"diff --git a/x.py b/x.py\n"
+        b"--- a/x.py\n"
+        b"+++ b/x.py\n"
+        b"@@ -3 +3 @@\n"
+        b"-old\n"
+        b"\\ No newline at end of file\n"
+        b"+new\n"
+        b"\\ No newline at end of file\n"
+        b"@@ -9,2 +9,0 @@\n"
+        b"--- gone\n"
+        b"-+++ gone\n"
+        b"@@ -20 +18,2 @@\n"
+        b"-a\n"
+        b"++b\n"
+        b"+c\n"
+    )
+    assert added_lines(diff) == {"x.py": [(3, b"new"), (18, b"+b"), (19, b"c")]}
+
+
+def test_paths_come_from_the_name_list_in_diff_order():
+    diff = (
+        b"diff --git \"a/we\\\"ird.py\" \"b/we\\\"ird.py\"\n"
+        b"new file mode 100644\n"
+        b"--- /dev/null\n"
+        b"+++ \"b/we\\\"ird.py\"\n"
+        b"@@ -0,0 +1 @@\n"
+        b"+token\n"
+        b"diff --git a/bin.dat b/bin.dat\n"
+        b"Binary files differ\n"
+        b"diff --git a/y.py b/y.py\n"
+        b"--- a/y.py\n"
+        b"+++ b/y.py\n"
+        b"@@ -1 +1 @@\n"
+        b"-a\n"
+        b"+b\n"
+    )
+    assert added_lines(diff, ['we"ird.py', "bin.dat", "y.py"]) == {
+        'we"ird.py': [(1, b"token")],
+        "bin.dat": [],
+        "y.py": [(1, b"b")],
+    }
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+def test_staged_scan_reports_secrets_after_header_like_lines_and_in_quoted_paths(tmp_path):
+    def git(*args):
+        subprocess.run(["git", "-C", str(tmp_path), *args], check=True, capture_output=True)
+
+    git("init", "-q")
+    (tmp_path / "x.py").write_text("print('hi')\n")
+    git("add", "x.py")
+    git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", "init")
+
+    (tmp_path / "x.py").write_text(f"print('hi')\n++ foo\nk = \"{STRIPE}\"\n")
+    (tmp_path / 'we"ird.py').write_text(f"token = \"{GITHUB}\"\n")
+    git("add", "x.py", 'we"ird.py')
+
+    found = {(finding.path, finding.line) for finding in iter_staged_findings(str(tmp_path), entropy=None)}
+    assert ("x.py", 3) in found
+    assert ('we"ird.py', 1) in found
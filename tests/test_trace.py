@@ -0,0 +1,61 @@
+import json
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+from secapi import trace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STRIPE = "sk_live_" + "4eC39HqLyjWDarjtT1zdp7dc"
+SAMPLE = re.compile(r'^[a-z_]+(?:\{[a-z]+="(?:[^"\\]|\\.)*"\})? -?\d+(?:\.\d+)?$')
+
+
+def check(*args):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.run([sys.executable, "-m", "secapi.cli", "check", *args], capture_output=True, text=True,
+                          env=env)
+
+
+@pytest.fixture
+def project(tmp_path):
+    root = tmp_path / "project"
+    root.mkdir()
+    for n in range(4):
+        (root / f"app_{n}.py").write_text(f'stripe = "{STRIPE}"\n')
+    return root
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_metrics_out_json(project, tmp_path, jobs):
+    out = tmp_path / "metrics.json"
+    result = check(str(project), "--format", "jsonl", "--jobs", jobs, "--metrics-out", str(out))
+    assert len(result.stdout.splitlines()) == 4
+
+    stats = json.loads(out.read_text())
+    assert stats["wall_seconds"] > 0
+    # Worker processes report back, so every file is accounted for.
+    assert stats["phases"]["scan.read"]["calls"] == 4
+    assert stats["phases"]["scan.read"]["bytes"] == sum(path.stat().st_size for path in project.iterdir())
+    assert len(stats["slowest_files"]) == 4
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_metrics_out_prometheus(project, tmp_path):
+    out = tmp_path / "metrics.prom"
+    check(str(project), "--format", "jsonl", "--metrics-out", str(out))
+
+    text = out.read_text()
+    samples = [line for line in text.splitlines() if not line.startswith("#")]
+    assert samples and all(SAMPLE.match(line) for line in samples), text
+    for metric in ("secapi_wall_seconds", "secapi_phase_seconds_total", "secapi_slow_file_seconds"):
+        assert f"# TYPE {metric} " in text
+    assert 'secapi_phase_calls_total{phase="scan.read"} 4' in samples
+
+
+def test_prometheus_labels_are_escaped():
+    stats = {"wall_seconds": 1.0, "phases": {},
+             "slowest_files": [{"path": 'we"ird\\path\n.py', "seconds": 0.5, "bytes": 1}]}
+    assert 'secapi_slow_file_seconds{path="we\\"ird\\\\path\\n.py"} 0.500000' in trace.prometheus_text(stats)
@@ -0,0 +1,69 @@
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+
+import pytest
+
+from secapi import secure, unlock_agent
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix domain sockets")
+
+
+@pytest.fixture
+def agent_socket(monkeypatch):
+    # Socket paths are limited to about 100 bytes, so not under tmp_path.
+    directory = tempfile.mkdtemp(prefix="secapi-")
+    path = os.path.join(directory, "agent.sock")
+    monkeypatch.setenv("SECAPI_AGENT_SOCK", path)
+    yield path
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def run_agent(vault, ttl=5):
+    fernet = secure.get_fernet()
+    thread = threading.Thread(target=unlock_agent.serve,
+                              args=(fernet, vault, ttl, None, secure.fingerprint_key()), daemon=True)
+    thread.start()
+    for _ in range(100):
+        if unlock_agent.request({"op": "ping"}):
+            return thread
+        time.sleep(0.01)
+    pytest.fail("the agent did not start")
+
+
+def test_agent_serves_keys_until_locked(vault, password, agent_socket, monkeypatch):
+    password("pw")
+    secure.store_secrets({"a": "1", "b": "2"})
+    fp_key = secure.fingerprint_key()
+    thread = run_agent(vault)
+
+    monkeypatch.setattr(secure, "_fernet_instance", None)
+    monkeypatch.setattr(secure, "_data_key", None)
+    monkeypatch.setattr(secure, "getpass", lambda prompt="": pytest.fail("prompted for the password"))
+    monkeypatch.setattr(secure, "fetch_keys", unlock_agent.fetch_keys)
+    monkeypatch.setattr(secure, "fetch_fingerprint_key", unlock_agent.fetch_fingerprint_key)
+    assert secure.load_keys(["b", "a"]) == ["2", "1"]
+    assert secure.fingerprint_key() == fp_key
+    with pytest.raises(KeyError, match="'zz'"):
+        secure.load_keys(["zz"])
+    assert unlock_agent.fetch_keys(vault + ".other", ["a"]) is None
+
+    assert unlock_agent.stop()
+    thread.join(1)
+    assert not thread.is_alive() and not os.path.exists(agent_socket)
+    assert unlock_agent.fetch_keys(vault, ["a"]) is None
+    assert not unlock_agent.stop()
+
+
+def test_agent_exits_when_its_ttl_runs_out(vault, password, agent_socket):
+    password("pw")
+    secure.store_secrets({"a": "1"})
+    thread = run_agent(vault, ttl=0.3)
+    assert unlock_agent.fetch_keys(vault, ["a"]) == ["1"]
+
+    thread.join(2)
+    assert not thread.is_alive() and not os.path.exists(agent_socket)
+    assert unlock_agent.fetch_keys(vault, ["a"]) is None
@@ -0,0 +1,131 @@
+import base64
+import json
+
+import pytest
+from cryptography.fernet import Fernet, InvalidToken
+
+from secapi import secure, vault_store
+from secapi.vault_store import COMPACT_MIN_GARBAGE, open_store, parse
+
+
+def records(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f.readlines()[1:] if line.strip()]
+
+
+def test_change_password_leaves_no_data_key_wrapped_with_the_old_one(vault, password, monkeypatch):
+    password("old")
+    secure.store_secrets({"stripe_key": "sk_live_abc"})
+    password("new", "new")
+    secure.change_vault_password()
+
+    wrapped = [record for record in records(vault) if record[:2] == ["meta", "data_key"]]
+    assert len(wrapped) == 1
+    kdfs = [record[2] for record in records(vault) if record[:2] == ["meta", "kdf"]]
+    for kdf in kdfs:
+        with pytest.raises(InvalidToken):
+            secure._derive_kek("old", kdf).decrypt(wrapped[0][2].encode())
+
+    monkeypatch.setattr(secure, "_fernet_instance", None)
+    password("new")
+    assert secure.load_key("stripe_key") == "sk_live_abc"
+
+
+def test_legacy_backup_is_removed_once_the_vault_is_upgraded(vault, password):
+    legacy = Fernet(base64.urlsafe_b64encode(b"pw".ljust(32, b"0")))
+    with open(vault, "w") as f:
+        json.dump({"stripe_key": legacy.encrypt(b"sk_live_abc").decode()}, f)
+
+    password("pw")
+    assert secure.load_key("stripe_key") == "sk_live_abc"
+    assert not open_store(vault).discard_backup()
+
+
+def test_deleted_and_rotated_values_leave_the_file(vault, password):
+    password("pw")
+    secure.store_secrets({"leaked": "sk_live_old", "other": "sk_live_other"})
+    old_token = secure._cached_vault()["leaked"]
+
+    password("sk_live_new")
+    secure.rotate_key("leaked")
+    with open(vault) as f:
+        assert old_token not in f.read()
+
+    rotated_token = secure._cached_vault()["leaked"]
+    secure.delete_key("leaked")
+    with open(vault) as f:
+        text = f.read()
+    assert rotated_token not in text and '"leaked"' not in text
+    assert secure.load_key("other") == "sk_live_other"
+
+
+def test_appends_update_the_cache_without_parsing_the_file_again(tmp_path, monkeypatch):
+    store = open_store(str(tmp_path / "log.json"))
+    store.write([("keys", "a", "1")])
+    store.get("keys")
+
+    monkeypatch.setattr(vault_store, "parse", lambda raw: pytest.fail("parsed the vault again"))
+    store.write([("keys", "b", "2"), ("keys", "a", None)])
+    assert store.get("keys") == {"b": "2"}
+    monkeypatch.undo()
+
+    with open(store.path, "rb") as f:
+        assert parse(f.read()) == ({"keys": {"b": "2"}}, 3)
+
+
+def test_log_is_compacted_from_the_running_record_count(tmp_path):
+    store = open_store(str(tmp_path / "log.json"))
+    for n in range(200):
+        store.write([("keys", "a", str(n))])
+    with open(store.path) as f:
+        assert len(f.readlines()) <= COMPACT_MIN_GARBAGE + 3
+    assert store.get("keys") == {"a": "199"}
+
+
+def test_load_keys_decrypts_in_order_and_sees_other_writers(vault, password, monkeypatch):
+    password("pw")
+    secure.store_secrets({"a": "1", "b": "2"})
+    data_key = secure._data_key
+
+    monkeypatch.setattr(secure, "_fernet_instance", None)
+    password("pw")  # A second prompt would run out of replies
+    assert secure.load_keys(["b", "a", "b"]) == ["2", "1", "2"]
+
+    # Another process appends to the same file.
+    vault_store.VaultStore(vault).write([("keys", "c", Fernet(data_key).encrypt(b"3").decode())])
+    assert secure.load_keys(["c", "a"]) == ["3", "1"]
+
+    with pytest.raises(KeyError, match="'zz'"):
+        secure.load_keys(["a", "zz"])
+    assert secure.load_keys([]) == []
+
+
+def test_vaulted_lookup_indexes_keys_written_without_fingerprints(vault, password, monkeypatch):
+    password("pw")
+    secure.store_secrets({"a": "sk_live_a"})
+    fernet = secure.get_fernet()
+    # Written by a secapi that predates fingerprints, or rewritten by one.
+    open_store(vault).write([("keys", "old", fernet.encrypt(b"sk_live_old").decode()),
+                             ("keys", "a", fernet.encrypt(b"sk_live_a2").decode())])
+
+    lookup = secure.vaulted_lookup()
+    assert (lookup("sk_live_old"), lookup("sk_live_a2"), lookup("sk_live_a"), lookup("nope")) == ("old", "a", None, None)
+    fp = open_store(vault).get("fp")
+    assert set(fp) == {"a", "old"}
+
+    # The index is now on disk: a fresh process needs no decryption.
+    monkeypatch.setattr(secure, "_fingerprint_index", None)
+    monkeypatch.setattr(secure, "_decrypted", {})
+    monkeypatch.setattr(secure, "load_keys", lambda names: pytest.fail(f"decrypted {names}"))
+    assert secure.vaulted_lookup()("sk_live_old") == "old"
+
+
+def test_vaulted_lookup_is_unavailable_while_locked(vault, password, monkeypatch):
+    password("pw")
+    secure.store_secrets({"a": "sk_live_a"})
+    monkeypatch.setattr(secure, "_fernet_instance", None)
+    monkeypatch.setattr(secure, "_data_key", None)
+    assert secure.vaulted_lookup() is None
+
+    password("pw")
+    assert secure.vaulted_lookup(unlock=True)("sk_live_a") == "a"
@@ -0,0 +1,63 @@
+import os
+
+from secapi.walker import walk
+
+TREE = {
+    ".gitignore": "# comment\nsecret*.py\n!secret_ok.py\nlogs/\ncache.json/\n/top.py\n",
+    ".secapiignore": "fixtures/**/*.json\n",
+    "app.py": "",
+    "top.py": "",
+    "secret_key.py": "",
+    "secret_ok.py": "",
+    "cache.json": "",
+    "notes.md": "",
+    "logs/today.txt": "",
+    "src/top.py": "",
+    "src/local.py": "",
+    "src/.gitignore": "local.py\n",
+    "src/cache.json/x.py": "",
+    "src/deep/local.py": "",
+    "local.py": "",
+    "fixtures/a/b/data.json": "",
+    "fixtures/readme.txt": "",
+    "node_modules/pkg/index.js": "",
+    ".git/hooks/pre-commit.py": "",
+    "build/lib/app.py": "",
+}
+
+
+def make_tree(root):
+    for name, text in TREE.items():
+        path = os.path.join(root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+
+def walked(root, **kwargs):
+    return [os.path.relpath(path, root).replace(os.sep, "/") for path in walk(str(root), **kwargs)]
+
+
+def test_ignore_files_apply_git_rules(tmp_path):
+    make_tree(tmp_path)
+    assert walked(tmp_path) == [
+        "app.py",
+        "cache.json",  # `cache.json/` only matches directories
+        "local.py",  # src/.gitignore only applies under src/
+        "secret_ok.py",  # Re-included by `!`
+        "fixtures/readme.txt",
+        "src/top.py",  # `/top.py` is anchored to the root
+    ]
+
+
+def test_pruned_dirs_are_skipped_even_without_ignore_files(tmp_path):
+    make_tree(tmp_path)
+    found = walked(tmp_path, use_ignore_files=False)
+    assert "src/local.py" in found and "logs/today.txt" in found
+    assert not [path for path in found if path.split("/")[0] in ("node_modules", ".git", "build")]
+
+
+def test_extensions_filter_files(tmp_path):
+    make_tree(tmp_path)
+    assert walked(tmp_path, extensions=(".js",), use_ignore_files=False) == []
+    assert walked(tmp_path, extensions=(".md",)) == ["notes.md"]